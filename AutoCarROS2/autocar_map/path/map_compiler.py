@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Offline map compiler. Reads the CSV maps defined in path_link.py once
+# (pandas is only needed here) and writes everything the nodes derive from
+# them into a single uncompressed .npz: per-link waypoints with yaw,
+# curvature and arc length, a uniform arc-length resampling, link ranges /
+# stop-line indices, base map, car_mode and next_path. path_link.load_map
+# reads it back in milliseconds and falls back to the CSVs when it is stale.
+#
+#   python3 map_compiler.py                 # path_link.map_name 만
+#   python3 map_compiler.py kcity htech     # 여러 맵
+#   python3 map_compiler.py --all --step 0.5
+
+import os
+import sys
+import argparse
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import path_link
+
+
+def arc_length(x, y):
+    ''' 각 점까지의 누적 거리 [m] '''
+    s = np.zeros(len(x))
+    if len(x) > 1:
+        s[1:] = np.cumsum(np.hypot(np.diff(x), np.diff(y)))
+    return s
+
+
+def path_yaw(x, y):
+    ''' 각 점의 진행 방향 (앞뒤 점 기준 중앙 차분) '''
+    if len(x) < 2:
+        return np.zeros(len(x))
+    return np.arctan2(np.gradient(y), np.gradient(x))
+
+
+def path_curvature(x, y):
+    ''' 연속한 세 점을 지나는 원의 부호 있는 곡률 (좌회전 +), 양 끝은 이웃 값 '''
+    k = np.zeros(len(x))
+    if len(x) < 3:
+        return k
+
+    ax, ay = x[1:-1] - x[:-2], y[1:-1] - y[:-2]
+    bx, by = x[2:] - x[1:-1], y[2:] - y[1:-1]
+    cx, cy = x[2:] - x[:-2], y[2:] - y[:-2]
+
+    cross = ax * by - ay * bx
+    norm = np.hypot(ax, ay) * np.hypot(bx, by) * np.hypot(cx, cy)
+    k[1:-1] = np.divide(2.0 * cross, norm, out=np.zeros_like(cross), where=norm > 1e-9)
+    k[0], k[-1] = k[1], k[-2]
+    return k
+
+
+def resample(x, y, step):
+    ''' 누적 거리 기준 step 간격으로 다시 뽑은 (x, y), 마지막 점 포함 '''
+    s = arc_length(x, y)
+    keep = np.concatenate(([True], np.diff(s) > 1e-9)) # 겹친 점 제거
+    x, y, s = x[keep], y[keep], s[keep]
+    if len(s) < 2:
+        return x, y
+
+    rs = np.arange(0.0, s[-1], step)
+    if s[-1] - rs[-1] > 1e-6:
+        rs = np.append(rs, s[-1])
+    return np.interp(rs, s, x), np.interp(rs, s, y)
+
+
+def concat(parts):
+    ''' list of arrays -> (이어 붙인 array, offsets) '''
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(p) for p in parts])
+    data = np.concatenate(parts) if len(parts) > 0 else np.zeros(0)
+    return data.astype(np.float64), offsets
+
+
+def compile_map(name, step):
+    ''' path_link.maps[name] 을 npz 에 들어갈 dict 로 '''
+    path = path_link.maps[name]()
+    keys = list(path.ax.keys())
+    sources = [os.path.relpath(source, path_link.file_path) for source in path.sources]
+
+    out = {
+        'keys': np.array(keys, dtype=str),
+        'sources': np.array(sources, dtype=str),
+        'hash': np.array(path_link.source_hash(path_link.maps[name], sources)),
+        'step': np.array(step),
+        'link_range': np.array([path.link_range[key] for key in keys], dtype=np.int64).reshape(-1, 2),
+        'car_mode': np.array(path.car_mode, dtype=str),
+        'next_path': np.array(path.next_path, dtype=str),
+    }
+
+    columns = {'x': [], 'y': [], 'yaw': [], 'curvature': [], 's': []}
+    resampled = {'x': [], 'y': [], 'yaw': [], 'curvature': [], 's': []}
+    for key in keys:
+        x = np.asarray(path.ax[key], dtype=float)
+        y = np.asarray(path.ay[key], dtype=float)
+        for table, (px, py) in [(columns, (x, y)), (resampled, resample(x, y, step))]:
+            table['x'].append(px)
+            table['y'].append(py)
+            table['yaw'].append(path_yaw(px, py))
+            table['curvature'].append(path_curvature(px, py))
+            table['s'].append(arc_length(px, py))
+
+    for column in columns:
+        out[column], out['offsets'] = concat(columns[column])
+        out['r' + column], out['resampled_offsets'] = concat(resampled[column])
+
+    base_map = getattr(path, 'base_map', [])
+    out['base_x'], out['base_offsets'] = concat([np.asarray(link['X-axis'], dtype=float) for link in base_map])
+    out['base_y'], _ = concat([np.asarray(link['Y-axis'], dtype=float) for link in base_map])
+
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the CSV maps in path_link.py into .npz files')
+    parser.add_argument('maps', nargs='*', help='map names (default: path_link.map_name)')
+    parser.add_argument('--all', action='store_true', help='compile every map in path_link.maps')
+    parser.add_argument('--step', type=float, default=0.5, help='resampling interval [m]')
+    parser.add_argument('--data', default=None, help='data directory (default: path_link.file_path)')
+    args = parser.parse_args()
+
+    if args.data is not None:
+        path_link.file_path = os.path.abspath(args.data)
+        path_link.compiled_path = os.path.join(path_link.file_path, 'compiled')
+
+    names = list(path_link.maps) if args.all else (args.maps or [path_link.map_name])
+    for name in names:
+        if name not in path_link.maps:
+            parser.error('unknown map {} (choose from {})'.format(name, ', '.join(path_link.maps)))
+
+    os.makedirs(path_link.compiled_path, exist_ok=True)
+    for name in names:
+        try:
+            out = compile_map(name, args.step)
+        except OSError as e:
+            print('{} : skipped ({})'.format(name, e))
+            continue
+
+        npz_file = os.path.join(path_link.compiled_path, name + '.npz')
+        np.savez(npz_file, **out)
+        print('{} : {} links, {} waypoints -> {}'.format(name, len(out['keys']), len(out['x']), npz_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,27 @@
 #!/usr/bin/env python3
 
 import os
+import sys
+import inspect
+import hashlib
 import numpy as np
-import pandas as pd
 
-from rclpy.node import Node
-from ament_index_python.packages import get_package_share_directory
+try:
+    from ament_index_python.packages import get_package_share_directory
+    file_path = os.path.join(get_package_share_directory('autocar_map'), 'data')
+except (ImportError, LookupError):
+    # ROS 환경 밖에서 실행할 때 (소스 트리에서 map_compiler.py 실행 등)
+    file_path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data'))
+compiled_path = os.path.join(file_path, 'compiled')
 
-file_path = os.path.join(get_package_share_directory('autocar_map'), 'data')
 
-
-class Path(Node):
+class Path:
     def __init__(self, bf_, gf_, pf_, rf_):
 
+        import pandas as pd # compile 된 맵이 없을 때만 필요
+
+        self.sources = [f for f in [bf_, gf_, pf_, rf_] if f is not None]
+        self.link_range = {} # ax 안에서 링크 자체 구간 [start, stop), 앞뒤로 붙인 점 제외
         self.global_map_x = {}
         self.global_map_y = {}
         self.ax = {}
@@ -46,6 +55,9 @@ class Path(Node):
                 self.ax[var_name] = link_data['X-axis'].tolist()
                 self.ay[var_name] = link_data['Y-axis'].tolist()
 
+                start = 0 if link == 0 else len(before)
+                self.link_range[var_name] = (start, start + len(data))
+
                 self.global_map_x[var_name] = data['X-axis'].tolist()
                 self.global_map_y[var_name] = data['Y-axis'].tolist()
 
@@ -63,6 +75,7 @@ class Path(Node):
 
                 self.ax[var_name] = data['X-axis'].tolist()
                 self.ay[var_name] = data['Y-axis'].tolist()
+                self.link_range[var_name] = (0, len(data))
 
         if rf_ is not None:
             df = pd.read_csv(rf_)
@@ -80,6 +93,7 @@ class Path(Node):
                 # kcity
                 self.ax[var_name] = [i - 0.4423572639935003 * d[link] for i in x0]
                 self.ay[var_name] = [i - 0.8308233860879995 * d[link] for i in y0]
+                self.link_range[var_name] = (0, len(x0))
                 # htech
                 # self.ax[var_name] = [i - 0.256388029315985 * d[link] for i in x0]
                 # self.ay[var_name] = [i - 0.904206226115093 * d[link] for i in y0]
@@ -204,5 +218,104 @@ def qualifier():
 
     return qualifier
 
-use_map = qualifier()
-start_index = 0
\ No newline at end of file
+
+class CompiledPath:
+    ''' map_compiler.py 로 만든 .npz 를 Path 와 같은 형태로 읽음 '''
+    def __init__(self, npz):
+        npz = {name: npz[name] for name in npz.files} # NpzFile 은 접근할 때마다 파일을 다시 읽음
+        keys = npz['keys'].tolist()
+        offsets = npz['offsets']
+        link_range = npz['link_range']
+
+        self.ax = {}
+        self.ay = {}
+        self.yaw = {}
+        self.curvature = {}
+        self.s = {}
+        self.link_range = {}
+        self.global_map_x = {}
+        self.global_map_y = {}
+        for i, key in enumerate(keys):
+            lo, hi = offsets[i], offsets[i+1]
+            self.ax[key] = npz['x'][lo:hi].tolist()
+            self.ay[key] = npz['y'][lo:hi].tolist()
+            self.yaw[key] = npz['yaw'][lo:hi]
+            self.curvature[key] = npz['curvature'][lo:hi]
+            self.s[key] = npz['s'][lo:hi]
+
+            start, stop = link_range[i]
+            self.link_range[key] = (int(start), int(stop))
+            if key.startswith('global'):
+                self.global_map_x[key] = self.ax[key][start:stop]
+                self.global_map_y[key] = self.ay[key][start:stop]
+
+        # 정지선 = 각 global 링크의 마지막 점 (ax index)
+        self.stop_index = {key: self.link_range[key][1] - 1 for key in self.global_map_x}
+
+        # 일정 간격(step)으로 다시 뽑은 경로
+        self.step = float(npz['step'])
+        self.resampled = {}
+        roffsets = npz['resampled_offsets']
+        for i, key in enumerate(keys):
+            lo, hi = roffsets[i], roffsets[i+1]
+            self.resampled[key] = {name: npz['r' + name][lo:hi] for name in ['x', 'y', 'yaw', 'curvature', 's']}
+
+        boffsets = npz['base_offsets']
+        self.base_map = []
+        for i in range(len(boffsets) - 1):
+            lo, hi = boffsets[i], boffsets[i+1]
+            self.base_map.append({'X-axis': npz['base_x'][lo:hi].tolist(), 'Y-axis': npz['base_y'][lo:hi].tolist()})
+
+        self.car_mode = npz['car_mode'].tolist()
+        self.next_path = npz['next_path'].tolist()
+
+
+def source_hash(build, sources):
+    ''' 맵 정의 코드와 CSV 내용의 hash, compile 된 맵이 최신인지 확인할 때 사용 (sources : file_path 기준 상대 경로) '''
+    h = hashlib.sha1()
+    h.update(inspect.getsource(Path).encode())
+    h.update(inspect.getsource(build).encode())
+    for source in sources:
+        h.update(source.encode())
+        with open(os.path.join(file_path, source), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load_map(name):
+    '''
+    compiled/<name>.npz 가 있고 CSV / 맵 정의가 바뀌지 않았으면 그것을 읽고,
+    아니면 CSV 를 직접 읽음 (pandas 필요)
+    '''
+    build = maps[name]
+    npz_file = os.path.join(compiled_path, name + '.npz')
+
+    if os.path.exists(npz_file):
+        with np.load(npz_file, allow_pickle=False) as npz:
+            sources = npz['sources'].tolist()
+            try:
+                fresh = str(npz['hash']) == source_hash(build, sources)
+            except OSError:
+                fresh = False
+
+            if fresh:
+                return CompiledPath(npz)
+
+        print('[path_link] {} is out of date, reading CSV. Run map_compiler.py {}'.format(npz_file, name), file=sys.stderr)
+
+    return build()
+
+
+maps = {
+    'test_track': test_track,
+    'boong': boong,
+    'htech': htech,
+    'revpark': revpark,
+    'uturn': uturn,
+    'kcity': kcity,
+    'qualifier': qualifier,
+}
+
+map_name = 'qualifier'
+use_map = load_map(map_name)
+start_index = 0
@@ -3,7 +3,6 @@
 import os
 import sys
 import numpy as np
-from collections import deque, Counter
 from scipy.interpolate import CubicSpline
 
 import rclpy
@@ -13,7 +12,8 @@ from ament_index_python.packages import get_package_share_directory
 from std_msgs.msg import Int32
 from autocar_msgs.msg import LinkArray, State2D, ObjectArray
 
-from autocar_nav.separation_axis_theorem import separating_axis_theorem, get_vertice_rect
+from autocar_nav.obb_collision import collision_matrix
+from autocar_nav.streaming_stats import MajorityVote
 
 path_module = os.path.join(get_package_share_directory('autocar_map'), 'path')
 sys.path.append(path_module)
@@ -66,9 +66,7 @@ class ParkingPath(Node):
         self.path = -1
         self.prev_path = -1
 
-        queue_size = 9
-        init_queue = [0 for _ in range(queue_size)]
-        self.queue = deque(init_queue, maxlen = queue_size)
+        self.queue = MajorityVote(9, fill=0)
         self.rev_check = []
 
         self.mode = 'global'
@@ -96,19 +94,14 @@ class ParkingPath(Node):
             if not self.path_check and wp >= self.P[0] + self.P[1]*0:
                 path = max(min(int((wp - self.P[0]) / self.P[1]), self.parking_num), 0)
                 if path != self.prev_path:
-                    queue_size = 9
-                    init_queue = [0 for _ in range(queue_size)]
-                    self.queue = deque(init_queue, maxlen = queue_size)
+                    self.queue = MajorityVote(9, fill=0)
 
                 if not self.parking_collision_check(self.parking_x[str(path)], self.parking_y[str(path)]):
                     self.queue.append(1)
                 else:
                     self.queue.append(0)
 
-                counter = Counter(self.queue)
-                value, count = counter.most_common(1)[0]
-
-                if value == 1:
+                if self.queue.mode() == 1:
                     self.path_check = True
                     self.path = path
 
@@ -118,9 +111,7 @@ class ParkingPath(Node):
             if not self.path_check and wp >= self.R[0] + self.R[1]*0:
                 path = max(min(int((wp - self.R[0]) / self.R[1]), self.revpark_num), 0)
                 if path != self.prev_path:
-                    queue_size = 13
-                    init_queue = [0 for _ in range(queue_size)]
-                    self.queue = deque(init_queue, maxlen = queue_size)
+                    self.queue = MajorityVote(13, fill=0)
                     self.rev_check = []
 
                 if not self.parking_collision_check(self.revpark_x[str(path)], self.revpark_y[str(path)]):
@@ -130,14 +121,9 @@ class ParkingPath(Node):
                     self.rev_check.append(False)
 
                 if len(self.rev_check) > 20:
-                    queue_size = 13
-                    init_queue = [0 for _ in range(queue_size)]
-                    self.queue = deque(init_queue, maxlen = queue_size)
-
-                counter = Counter(self.queue)
-                value, count = counter.most_common(1)[0]
+                    self.queue.reset(fill=0)
 
-                if value == 1:
+                if self.queue.mode() == 1:
                     self.path_check = True
                     self.path = path
 
@@ -160,18 +146,8 @@ class ParkingPath(Node):
         cx = dx[:-1]
         cy = dy[:-1]
 
-        car_msg = []
-        for i in range(0,len(cyaw)):
-            car_msg.append((cx[i], cy[i], cyaw[i], 1.5, 1.5)) # x, y, yaw, length, width
-            for obs in self.obstacles:
-                for car in car_msg:
-                    car_vertices = get_vertice_rect(car)
-                    obstacle_vertices = get_vertice_rect(obs)
-                    is_collide = separating_axis_theorem(car_vertices, obstacle_vertices)
-
-                    if is_collide:
-                        return True
-        return False
+        cars = np.column_stack((cx, cy, cyaw, np.full(len(cyaw), 1.5), np.full(len(cyaw), 1.5))) # x, y, yaw, length, width
+        return bool(collision_matrix(cars, self.obstacles).any())
 
     def park_path_publish(self):
 
@@ -11,12 +11,13 @@ from rclpy.duration import Duration
 
 from std_msgs.msg import Int32MultiArray, String, Float32
 from sensor_msgs.msg import LaserScan
-from autocar_msgs.msg import Path2D
-from geometry_msgs.msg import Point, Pose2D, TransformStamped
+from autocar_msgs.msg import CompactPath2D
+from geometry_msgs.msg import Point, TransformStamped
 from visualization_msgs.msg import Marker
 
 from autocar_nav.quaternion import euler_from_quaternion
 from autocar_nav.transform_to_matrix import transform_to_matrix
+from autocar_nav.path_msg import path_to_msg
 
 from tf2_ros.buffer import Buffer
 from tf2_ros.transform_listener import TransformListener
@@ -27,7 +28,7 @@ class WallFollower(Node):
         super().__init__('wall_follower')
         self.create_rate(10)
         self.viz_pub = self.create_publisher(Marker, '/rviz/wall', 10)
-        self.path_pub = self.create_publisher(Path2D, '/wall_path', 10)
+        self.path_pub = self.create_publisher(CompactPath2D, '/wall_path', 10)
         self.lidar_yaw_pub = self.create_publisher(Float32, '/lidar_yaw', 10)
         # self.state_pub = self.create_publisher(String, '/tunnel_check', 10)
 
@@ -191,20 +192,17 @@ class WallFollower(Node):
 
 
     def scaned_publish(self):
-        wall_path = Path2D()
+        px, py = [], []
         if self.x_coords is not None:
             waypoints = min(len(self.x_coords), len(self.y_coords))
 
             for i in range(min(waypoints, self.path_length)) :
                 wx, wy, wyaw = self.change_frame(float(self.x_coords[i]), float(self.y_coords[i]), self.slope, self.world_frame, self.detection_frame)
 
-                path = Pose2D()
-                path.x = wx
-                path.y = wy
+                px.append(wx)
+                py.append(wy)
 
-                wall_path.poses.append(path)
-
-        self.path_pub.publish(wall_path)
+        self.path_pub.publish(path_to_msg(px, py))
         # self.state_pub.publish(self.state)
 
 
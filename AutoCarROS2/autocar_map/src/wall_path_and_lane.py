@@ -10,12 +10,13 @@ from rclpy.duration import Duration
 
 from std_msgs.msg import Int32MultiArray, String, Float32
 from sensor_msgs.msg import LaserScan
-from autocar_msgs.msg import Path2D
-from geometry_msgs.msg import Point, Pose2D, TransformStamped
+from autocar_msgs.msg import CompactPath2D
+from geometry_msgs.msg import Point, TransformStamped
 from visualization_msgs.msg import Marker
 
 from autocar_nav.quaternion import euler_from_quaternion
 from autocar_nav.transform_to_matrix import transform_to_matrix
+from autocar_nav.path_msg import path_to_msg
 
 from tf2_ros.buffer import Buffer
 from tf2_ros.transform_listener import TransformListener
@@ -26,8 +27,8 @@ class WallFollower(Node):
         super().__init__('wall_follower')
         self.create_rate(10)
         self.viz_pub = self.create_publisher(Marker, '/rviz/wall', 10)
-        self.path_pub = self.create_publisher(Path2D, '/wall_path', 10)
-        self.lane_pub = self.create_publisher(Path2D, '/wall_lane', 10)
+        self.path_pub = self.create_publisher(CompactPath2D, '/wall_path', 10)
+        self.lane_pub = self.create_publisher(CompactPath2D, '/wall_lane', 10)
         self.lidar_yaw_pub = self.create_publisher(Float32, '/lidar_yaw', 10)
 
         self.scan_sub = self.create_subscription(LaserScan,'/scan', self.scan_callback, 10)
@@ -180,39 +181,27 @@ class WallFollower(Node):
 
 
     def scaned_publish(self):
-        wall_path = Path2D()
-        wall_lane = Path2D()
+        px, py = [], []
+        lx, ly = [], []
         if self.x_coords is not None:
             waypoints = min(len(self.x_coords), len(self.y_coords))
 
             for i in range(waypoints) :
                 wx, wy, wyaw = self.change_frame(float(self.x_coords[i]), float(self.y_coords[i]), self.slope, self.world_frame, self.detection_frame)
 
-                path = Pose2D()
-                path.x = wx
-                path.y = wy
-
-                wall_path.poses.append(path)
+                px.append(wx)
+                py.append(wy)
 
             dist = 5
             for i in range(int(waypoints/dist)):
                 l1x, l1y, l1yaw = self.change_frame(float(self.x_lane1[dist*i]), float(self.y_lane1[dist*i]), self.slope, self.world_frame, self.detection_frame)
                 l2x, l2y, l2yaw = self.change_frame(float(self.x_lane2[dist*i]), float(self.y_lane2[dist*i]), self.slope, self.world_frame, self.detection_frame)
 
-                lane1 = Pose2D()
-                lane1.x = l1x
-                lane1.y = l1y
-
-                wall_lane.poses.append(lane1)
-
-                lane2 = Pose2D()
-                lane2.x = l2x
-                lane2.y = l2y
-
-                wall_lane.poses.append(lane2)
+                lx.extend([l1x, l2x])
+                ly.extend([l1y, l2y])
 
-        self.path_pub.publish(wall_path)
-        self.lane_pub.publish(wall_lane)
+        self.path_pub.publish(path_to_msg(px, py))
+        self.lane_pub.publish(path_to_msg(lx, ly))
 
 
 def main(args=None):
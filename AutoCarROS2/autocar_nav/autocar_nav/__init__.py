@@ -1,9 +1,24 @@
 from autocar_nav.cubic_spline_interpolator import generate_cubic_path
 from autocar_nav.normalise_angle import normalise_angle
 from autocar_nav.quaternion import yaw_to_quaternion, euler_from_quaternion
-from autocar_nav.calculate_curvature import classify_segments
+from autocar_nav.calculate_curvature import classify_segments, DirectionProfile
 from autocar_nav.calculate_offset import point_offset, line_offset
 from autocar_nav.separation_axis_theorem import separating_axis_theorem, get_vertice_rect
+from autocar_nav.obb_collision import collision_matrix
+from autocar_nav.obstacle_index import ObstacleIndex
+from autocar_nav.path_msg import path_to_msg, msg_to_arrays
+from autocar_nav.visualization import ThrottledPublisher
+from autocar_nav.change_publisher import ChangePublisher
+from autocar_nav.path_index import PathIndex
+from autocar_nav.window_search import WindowSearch
+from autocar_nav.mpc_steering import LinearMPC
+from autocar_nav.collision_map import CollisionMap, footprint_discs
+from autocar_nav.dubins_path import dubins_path
+from autocar_nav.heuristic import NonHolonomicHeuristic, HolonomicHeuristic
 from autocar_nav.hybrid_a_star import hybrid_a_star
 from autocar_nav.transform_to_matrix import transform_to_matrix
 from autocar_nav.delaunay_triangulation import DelaunayTriPath
+from autocar_nav.mission import MissionEngine, MissionInputs
+from autocar_nav.node_clock import NodeClock, ManualClock
+from autocar_nav.streaming_stats import MajorityVote, RollingVariance, RollingQuantile
+from autocar_nav.point_cloud import cloud_to_array, array_to_cloud, region_mask, split_rings, cloud_stats, Region, TUNNEL_CEILING
@@ -36,6 +36,66 @@ def classify_segments(x, y, threshold):
 
     return direction
 
+class DirectionProfile:
+    '''
+    한 link 전체에 대해 classify_segments 결과를 미리 계산.
+    direction(start, stop) == classify_segments(x[start:stop], y[start:stop], threshold)
+    '''
+    def __init__(self, x, y, threshold, max_window=30):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.threshold = threshold
+        self.max_window = max_window
+
+        # curvature[j, m-1] : 점 j, j+m, j+m+1 을 지나는 원의 곡률 (classify_segments 의 i = m)
+        n = len(self.x)
+        j = np.arange(n)[:, None]
+        m = np.arange(1, max(max_window - 1, 1))[None, :]
+        valid = j + m + 1 < n
+        i1 = np.minimum(j + m, n - 1)
+        i2 = np.minimum(j + m + 1, n - 1)
+        self.curvature = np.where(valid, points_curvature(self.x[j], self.y[j], self.x[i1], self.y[i1], self.x[i2], self.y[i2]), 0.0)
+
+        # curve_count[j, L] : window x[j:j+L] 에서 'Curve' 로 분류되는 점 개수
+        curve = valid & (self.curvature >= threshold)
+        self.curve_count = np.zeros((n, curve.shape[1] + 3), dtype=int)
+        self.curve_count[:, 3:] = np.cumsum(curve, axis=1)
+
+    def __len__(self):
+        return len(self.x)
+
+    def direction(self, start, stop):
+        ''' x[start:stop] 구간의 'Straight' / 'Curve' '''
+        stop = min(stop, len(self.x))
+        length = stop - start
+        if length < 2:
+            return 'Straight'
+        if length >= self.curve_count.shape[1]:
+            return classify_segments(self.x[start:stop], self.y[start:stop], self.threshold)
+
+        curve = self.curve_count[start, length]
+        straight = (length - 1) - curve # 첫 점은 항상 'Straight'
+        # statistics.mode 는 동률이면 먼저 나온 'Straight'
+        return 'Curve' if curve > straight else 'Straight'
+
+
+def points_curvature(x1, y1, x2, y2, x3, y3):
+    '''
+    calculate_point_curvature 의 numpy 버전, 같은 연산 순서라 결과도 같음
+    (중복 점의 변 길이 0 -> 1e-2, 헤론 공식이 음수면 넓이 0 까지)
+    '''
+    length1 = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+    length2 = np.sqrt((x3 - x2)**2 + (y3 - y2)**2)
+    length3 = np.sqrt((x1 - x3)**2 + (y1 - y3)**2)
+    length1 = np.where(length1 != 0, length1, 1e-2)
+    length2 = np.where(length2 != 0, length2, 1e-2)
+    length3 = np.where(length3 != 0, length3, 1e-2)
+
+    s = (length1 + length2 + length3) / 2.0
+    heron = s * (s - length1) * (s - length2) * (s - length3)
+    area = np.sqrt(np.maximum(heron, 0.0))
+    return 2.0 * area / (length1 * length2 * length3)
+
 def calculate_point_curvature(x1, y1, x2, y2, x3, y3):
     l1 = calculate_distance(x1, y1, x2, y2)
     l2 = calculate_distance(x2, y2, x3, y3)
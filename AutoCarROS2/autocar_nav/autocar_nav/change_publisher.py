@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Publisher for status topics that are recomputed every tick but rarely
+# change (LinkArray, /yolo_mode). In on-change mode a message is only sent
+# when it differs from the last one sent, plus a low-rate heartbeat so late
+# joiners and lost messages still converge. on_change=False keeps the old
+# publish-every-tick behaviour.
+
+import time
+
+
+class ChangePublisher:
+    def __init__(self, node, msg_type, topic, heartbeat, on_change=True, qos=10):
+        '''
+        heartbeat : 바뀐 것이 없어도 다시 publish 하는 주기 [Hz], 0 이하이면 바뀔 때만
+        on_change : False 이면 publish 할 때마다 그대로 보냄
+        '''
+        self.publisher = node.create_publisher(msg_type, topic, qos)
+        self.period = 1.0 / heartbeat if heartbeat > 0 else None
+        self.on_change = on_change
+
+        self.last_msg = None
+        self.last_publish = None
+
+    def publish(self, msg):
+        ''' return : 실제로 publish 했으면 True '''
+        if self.on_change and self.last_msg is not None and msg == self.last_msg:
+            if self.period is None or time.monotonic() - self.last_publish < self.period:
+                return False
+
+        self.last_msg = msg
+        self.last_publish = time.monotonic()
+        self.publisher.publish(msg)
+        return True
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Rasterizes oriented obstacle boxes once into an occupancy grid and
+# keeps its Euclidean distance transform, so that most footprint checks
+# become a handful of O(1) disc lookups. Footprints close to an obstacle
+# need the exact box test (obb_collision).
+
+import math
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+
+def footprint_discs(length, width):
+    '''
+    차량 사각형(length x width)을 덮는 원들의 (길이방향 offset, 폭방향 offset) 과 반지름.
+    긴 변을 따라 짧은 변 절반 크기의 구간마다 원을 하나씩 둔다.
+    '''
+    long_side = max(length, width)
+    short_side = min(length, width)
+
+    n = int(math.ceil(2.0 * long_side / short_side))
+    segment = long_side / n
+    radius = math.hypot(segment / 2.0, short_side / 2.0)
+
+    offsets = [-long_side / 2.0 + segment * (i + 0.5) for i in range(n)]
+    if length >= width:
+        discs = [(o, 0.0) for o in offsets]
+    else:
+        discs = [(0.0, o) for o in offsets]
+
+    return discs, radius
+
+
+class CollisionMap:
+    def __init__(self, min_x, max_x, min_y, max_y, obstacle=[], resolution=0.1, margin=0.0):
+        self.resolution = resolution
+        self.origin_x = min_x - margin
+        self.origin_y = min_y - margin
+        self.nx = int(math.ceil((max_x - min_x + 2 * margin) / resolution)) + 1
+        self.ny = int(math.ceil((max_y - min_y + 2 * margin) / resolution)) + 1
+
+        # occupancy[ix, iy] : cell 중심 좌표 = origin + index * resolution
+        self.occupancy = np.zeros((self.nx, self.ny), dtype=bool)
+        for obs in obstacle:
+            self.add_rect(obs)
+
+        if self.occupancy.any():
+            # 가장 가까운 장애물 cell 중심까지의 거리에서 cell 대각선만큼 빼서
+            # 실제 장애물까지 거리의 하한값으로 사용
+            self.distance = distance_transform_edt(~self.occupancy) * resolution - math.sqrt(2) * resolution
+        else:
+            self.distance = np.full((self.nx, self.ny), np.inf)
+
+    def rect_cells(self, obs, pad=0.0):
+        ''' (x, y, yaw, length, width) 사각형(pad 만큼 확장) 안에 중심이 있는 cell 의 slice 와 mask '''
+        x, y, yaw, length, width = obs[0], obs[1], obs[2], obs[3], obs[4]
+        c = math.cos(yaw)
+        s = math.sin(yaw)
+
+        half_l = length / 2.0 + pad
+        half_w = width / 2.0 + pad
+
+        ext_x = abs(c) * half_l + abs(s) * half_w
+        ext_y = abs(s) * half_l + abs(c) * half_w
+
+        ix0 = max(int(math.floor((x - ext_x - self.origin_x) / self.resolution)), 0)
+        ix1 = min(int(math.ceil((x + ext_x - self.origin_x) / self.resolution)) + 1, self.nx)
+        iy0 = max(int(math.floor((y - ext_y - self.origin_y) / self.resolution)), 0)
+        iy1 = min(int(math.ceil((y + ext_y - self.origin_y) / self.resolution)) + 1, self.ny)
+        if ix0 >= ix1 or iy0 >= iy1:
+            return None, None
+
+        gx = self.origin_x + np.arange(ix0, ix1) * self.resolution - x
+        gy = self.origin_y + np.arange(iy0, iy1) * self.resolution - y
+        gx, gy = np.meshgrid(gx, gy, indexing='ij')
+
+        u = gx * c + gy * s
+        v = -gx * s + gy * c
+        mask = (np.abs(u) <= half_l) & (np.abs(v) <= half_w)
+
+        return (slice(ix0, ix1), slice(iy0, iy1)), mask
+
+    def add_rect(self, obs):
+        ''' 사각형과 겹치는 cell 을 모두 occupied 로 표시 '''
+        # cell 반 대각선만큼 키워서 사각형에 걸치는 cell 이 빠지지 않도록 함
+        cells, mask = self.rect_cells(obs, pad=math.sqrt(2) * self.resolution / 2.0)
+        if cells is not None:
+            self.occupancy[cells] |= mask
+
+    def distance_at(self, x, y):
+        ''' (x, y) 에서 가장 가까운 장애물까지의 거리 (하한값), 맵 밖은 장애물 없음 '''
+        ix = int((x - self.origin_x) / self.resolution + 0.5)
+        iy = int((y - self.origin_y) / self.resolution + 0.5)
+        if 0 <= ix < self.nx and 0 <= iy < self.ny:
+            return self.distance[ix, iy]
+        return math.inf
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Forward-only (Dubins) shortest paths between two poses for a given
+# turning radius. Used by hybrid A* as an analytic expansion to the goal.
+
+import math
+
+
+def mod2pi(theta):
+    return theta - 2.0 * math.pi * math.floor(theta / (2.0 * math.pi))
+
+
+# 정규화된 (d, alpha, beta) 에 대한 각 경로 형태의 세 구간 길이 (t, p, q)
+def LSL(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    p_squared = 2 + d * d - 2 * c_ab + 2 * d * (sa - sb)
+    if p_squared < 0:
+        return None
+    tmp = math.atan2(cb - ca, d + sa - sb)
+    return mod2pi(-alpha + tmp), math.sqrt(p_squared), mod2pi(beta - tmp)
+
+def RSR(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    p_squared = 2 + d * d - 2 * c_ab + 2 * d * (sb - sa)
+    if p_squared < 0:
+        return None
+    tmp = math.atan2(ca - cb, d - sa + sb)
+    return mod2pi(alpha - tmp), math.sqrt(p_squared), mod2pi(-beta + tmp)
+
+def LSR(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    p_squared = -2 + d * d + 2 * c_ab + 2 * d * (sa + sb)
+    if p_squared < 0:
+        return None
+    p = math.sqrt(p_squared)
+    tmp = math.atan2(-ca - cb, d + sa + sb) - math.atan2(-2.0, p)
+    return mod2pi(-alpha + tmp), p, mod2pi(-beta + tmp)
+
+def RSL(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    p_squared = -2 + d * d + 2 * c_ab - 2 * d * (sa + sb)
+    if p_squared < 0:
+        return None
+    p = math.sqrt(p_squared)
+    tmp = math.atan2(ca + cb, d - sa - sb) - math.atan2(2.0, p)
+    return mod2pi(alpha - tmp), p, mod2pi(beta - tmp)
+
+def RLR(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    tmp = (6.0 - d * d + 2.0 * c_ab + 2.0 * d * (sa - sb)) / 8.0
+    if abs(tmp) > 1.0:
+        return None
+    p = mod2pi(2 * math.pi - math.acos(tmp))
+    t = mod2pi(alpha - math.atan2(ca - cb, d - sa + sb) + p / 2.0)
+    return t, p, mod2pi(alpha - beta - t + p)
+
+def LRL(alpha, beta, d, sa, sb, ca, cb, c_ab):
+    tmp = (6.0 - d * d + 2.0 * c_ab + 2.0 * d * (sb - sa)) / 8.0
+    if abs(tmp) > 1.0:
+        return None
+    p = mod2pi(2 * math.pi - math.acos(tmp))
+    t = mod2pi(-alpha - math.atan2(ca - cb, d + sa - sb) + p / 2.0)
+    return t, p, mod2pi(beta - alpha - t + p)
+
+PLANNERS = {'LSL': LSL, 'RSR': RSR, 'LSR': LSR, 'RSL': RSL, 'RLR': RLR, 'LRL': LRL}
+
+
+def dubins_candidates(start, end, radius):
+    '''
+    start, end : (x, y, yaw[rad])
+    return : [(length, mode, (t, p, q)), ...] 길이가 짧은 순서
+    '''
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    d = math.hypot(dx, dy) / radius
+    theta = mod2pi(math.atan2(dy, dx))
+    alpha = mod2pi(start[2] - theta)
+    beta = mod2pi(end[2] - theta)
+
+    sa, sb = math.sin(alpha), math.sin(beta)
+    ca, cb = math.cos(alpha), math.cos(beta)
+    c_ab = math.cos(alpha - beta)
+
+    candidates = []
+    for mode, planner in PLANNERS.items():
+        lengths = planner(alpha, beta, d, sa, sb, ca, cb, c_ab)
+        if lengths is None:
+            continue
+        candidates.append((sum(lengths) * radius, mode, lengths))
+
+    candidates.sort(key=lambda c: c[0])
+    return candidates
+
+
+def sample_dubins(start, mode, lengths, radius, step):
+    '''
+    start 에서 mode/lengths 경로를 따라 step 간격으로 (x, y, yaw) 를 샘플링 (start 제외)
+    '''
+    x, y, yaw = start
+    path = []
+    residual = 0.0 # 이전 구간에서 남은 거리
+
+    for m, length in zip(mode, lengths):
+        seg_length = length * radius
+        s = step - residual
+        while s <= seg_length:
+            path.append(move(x, y, yaw, m, s, radius))
+            s += step
+        residual = seg_length - (s - step)
+        x, y, yaw = move(x, y, yaw, m, seg_length, radius)
+
+    # 마지막 점은 구간 끝 (goal) 으로 맞춤
+    if residual > 1e-6 or len(path) == 0:
+        path.append((x, y, yaw))
+
+    return path
+
+
+def move(x, y, yaw, m, s, radius):
+    if m == 'S':
+        return x + s * math.cos(yaw), y + s * math.sin(yaw), yaw
+
+    sign = 1.0 if m == 'L' else -1.0
+    dyaw = sign * s / radius
+    nx = x + sign * radius * (math.sin(yaw + dyaw) - math.sin(yaw))
+    ny = y - sign * radius * (math.cos(yaw + dyaw) - math.cos(yaw))
+
+    return nx, ny, yaw + dyaw
+
+
+def dubins_path(start, end, radius, step):
+    ''' 가장 짧은 Dubins 경로의 샘플 점들 (start 제외, end 포함) '''
+    candidates = dubins_candidates(start, end, radius)
+    if len(candidates) == 0:
+        return None
+
+    _, mode, lengths = candidates[0]
+    return sample_dubins(start, mode, lengths, radius, step)
+
+
+def main():
+    import matplotlib.pyplot as plt
+
+    start = (0.0, 0.0, math.radians(0))
+    end = (4.0, 3.0, math.radians(180))
+    radius = 1.0
+
+    for length, mode, lengths in dubins_candidates(start, end, radius):
+        path = sample_dubins(start, mode, lengths, radius, 0.1)
+        print(mode, length, path[-1])
+        plt.plot([p[0] for p in path], [p[1] for p in path], label=mode)
+
+    plt.legend()
+    plt.axis("equal")
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Heuristics for hybrid A*.
+#  - NonHolonomicHeuristic : Dubins path length to the goal ignoring obstacles,
+#                            looked up from a table precomputed for one turning radius.
+#  - HolonomicHeuristic    : shortest 8-connected grid distance to the goal
+#                            around obstacles, computed once per search.
+
+import math
+import argparse
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from autocar_nav.dubins_path import dubins_candidates
+
+
+def dubins_length(start, end, radius):
+    candidates = dubins_candidates(start, end, radius)
+    if len(candidates) == 0:
+        return math.inf
+    return candidates[0][0]
+
+
+class NonHolonomicHeuristic:
+    def __init__(self, radius, table=None, extent=20.0, resolution=0.5, yaw_bins=24):
+        self.radius = radius
+        self.extent = extent
+        self.resolution = resolution
+        self.yaw_bins = yaw_bins
+        self.yaw_resolution = 2 * math.pi / yaw_bins
+        self.n = int(round(2 * extent / resolution)) + 1
+
+        # table[ix, iy, iyaw] : goal 좌표계에서 (x, y, yaw) 인 점에서 goal 까지의 Dubins 길이
+        self.table = table
+
+    @classmethod
+    def generate(cls, radius, extent=20.0, resolution=0.5, yaw_bins=24):
+        heuristic = cls(radius, extent=extent, resolution=resolution, yaw_bins=yaw_bins)
+        table = np.zeros((heuristic.n, heuristic.n, yaw_bins), dtype=np.float32)
+        goal = (0.0, 0.0, 0.0)
+
+        for i in range(heuristic.n):
+            x = -extent + i * resolution
+            for j in range(heuristic.n):
+                y = -extent + j * resolution
+                for k in range(yaw_bins):
+                    table[i, j, k] = dubins_length((x, y, k * heuristic.yaw_resolution), goal, radius)
+
+        heuristic.table = table
+        return heuristic
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(float(data['radius']), table=data['table'], extent=float(data['extent']),
+                   resolution=float(data['resolution']), yaw_bins=int(data['yaw_bins']))
+
+    def save(self, path):
+        np.savez_compressed(path, table=self.table, radius=self.radius, extent=self.extent,
+                            resolution=self.resolution, yaw_bins=self.yaw_bins)
+
+    def matches(self, radius, tolerance=1e-2):
+        return self.table is not None and abs(self.radius - radius) < tolerance
+
+    def cost(self, node, end):
+        # node 를 goal 좌표계로 변환
+        dx = node[0] - end[0]
+        dy = node[1] - end[1]
+        c = math.cos(end[2])
+        s = math.sin(end[2])
+        lx = dx * c + dy * s
+        ly = -dx * s + dy * c
+
+        if self.table is not None:
+            i = int(round((lx + self.extent) / self.resolution))
+            j = int(round((ly + self.extent) / self.resolution))
+            if 0 <= i < self.n and 0 <= j < self.n:
+                k = int(round((node[2] - end[2]) / self.yaw_resolution)) % self.yaw_bins
+                return float(self.table[i, j, k])
+
+        # table 범위 밖이면 직접 계산
+        return dubins_length((lx, ly, node[2] - end[2]), (0.0, 0.0, 0.0), self.radius)
+
+
+class HolonomicHeuristic:
+    def __init__(self, collision_map, min_x, max_x, min_y, max_y, end, resolution, clearance):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.resolution = resolution
+        self.nx = int(math.ceil((max_x - min_x) / resolution)) + 1
+        self.ny = int(math.ceil((max_y - min_y) / resolution)) + 1
+
+        # 격자 중심에서 장애물까지 거리가 clearance 이하이면 차량 중심이 갈 수 없는 cell
+        gx = min_x + np.arange(self.nx) * resolution
+        gy = min_y + np.arange(self.ny) * resolution
+        ix = np.clip(((gx - collision_map.origin_x) / collision_map.resolution + 0.5).astype(int), 0, collision_map.nx - 1)
+        iy = np.clip(((gy - collision_map.origin_y) / collision_map.resolution + 0.5).astype(int), 0, collision_map.ny - 1)
+        free = collision_map.distance[np.ix_(ix, iy)] > clearance
+
+        goal = self.index(end)
+        if goal is None:
+            self.cost_grid = None
+            return
+        free[goal] = True
+
+        # 8 방향 인접 free cell 끼리 edge 를 만들고 goal 에서 dijkstra
+        index = np.arange(self.nx * self.ny).reshape(self.nx, self.ny)
+        rows, cols, weights = [], [], []
+        for di, dj in [(1, 0), (0, 1), (1, 1), (1, -1)]:
+            a = (slice(max(-di, 0), self.nx - max(di, 0)), slice(max(-dj, 0), self.ny - max(dj, 0)))
+            b = (slice(max(di, 0), self.nx - max(-di, 0)), slice(max(dj, 0), self.ny - max(-dj, 0)))
+            valid = free[a] & free[b]
+            rows.append(index[a][valid])
+            cols.append(index[b][valid])
+            weights.append(np.full(np.count_nonzero(valid), math.hypot(di, dj) * resolution))
+
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        weights = np.concatenate(weights)
+        graph = coo_matrix((weights, (rows, cols)), shape=(self.nx * self.ny, self.nx * self.ny)).tocsr()
+
+        self.cost_grid = dijkstra(graph, directed=False, indices=index[goal]).reshape(self.nx, self.ny)
+
+    def index(self, node):
+        i = int(round((node[0] - self.min_x) / self.resolution))
+        j = int(round((node[1] - self.min_y) / self.resolution))
+        if 0 <= i < self.nx and 0 <= j < self.ny:
+            return i, j
+        return None
+
+    def cost(self, node):
+        ''' goal 까지 장애물을 피해가는 격자 거리, 계산할 수 없으면 inf '''
+        if self.cost_grid is None:
+            return math.inf
+        idx = self.index(node)
+        if idx is None:
+            return math.inf
+        return self.cost_grid[idx]
+
+
+def main():
+    # ERP42 : length 1.6 m, 최대 조향 27 deg -> 최소 회전반경 약 3.14 m
+    parser = argparse.ArgumentParser(description='Generate the non-holonomic heuristic table for hybrid A*')
+    parser.add_argument('--length', type=float, default=1.6)
+    parser.add_argument('--max_steer', type=float, default=27.0, help='degree')
+    parser.add_argument('--extent', type=float, default=20.0)
+    parser.add_argument('--resolution', type=float, default=0.5)
+    parser.add_argument('--yaw_bins', type=int, default=24)
+    parser.add_argument('--output', type=str, default='dubins_heuristic.npz')
+    args = parser.parse_args()
+
+    radius = args.length / math.tan(math.radians(args.max_steer))
+    heuristic = NonHolonomicHeuristic.generate(radius, extent=args.extent,
+                                               resolution=args.resolution, yaw_bins=args.yaw_bins)
+    heuristic.save(args.output)
+    print('radius : %.3f, table : %s -> %s' % (radius, heuristic.table.shape, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,70 @@ import heapq as hq
 import math
 import matplotlib.pyplot as plt
 import numpy as np
-from autocar_nav.separation_axis_theorem import separating_axis_theorem, get_vertice_rect
+from autocar_nav.collision_map import CollisionMap, footprint_discs
+from autocar_nav.obstacle_index import ObstacleIndex
+from autocar_nav.dubins_path import dubins_candidates, sample_dubins
+from autocar_nav.heuristic import NonHolonomicHeuristic, HolonomicHeuristic
+
+# 같은 파라미터의 motion primitive table 은 프로세스 안에서 한 번만 계산
+_primitive_cache = {}
+
+class MotionPrimitives:
+    def __init__(self, step, length, max_steer, steering_samples, heading_samples, disc_offsets):
+        self.heading_samples = heading_samples
+        self.heading_resolution = 2 * math.pi / heading_samples
+        self.theta = [h * self.heading_resolution for h in range(heading_samples)]
+
+        # 조향이 클수록 비용 증가 (최대 조향일 때 0.3)
+        steering_inputs = np.linspace(-max_steer, max_steer, steering_samples)
+        cost_steering_inputs = [0.3 * abs(delta) / max_steer for delta in steering_inputs]
+
+        # successors[h] : heading h 에서 각 조향으로 step 만큼 원호 주행했을 때 (dx, dy, 다음 heading, 다음 yaw, 비용)
+        self.successors = []
+        for h in range(heading_samples):
+            theta = self.theta[h]
+            successors = []
+            for delta, cost_steer in zip(steering_inputs, cost_steering_inputs):
+                dh = int(round(step * math.tan(math.radians(delta)) / length / self.heading_resolution))
+                next_h = (h + dh) % heading_samples
+                dtheta = dh * self.heading_resolution
+
+                if dh == 0:
+                    dx = step * math.cos(theta)
+                    dy = step * math.sin(theta)
+                else:
+                    radius = step / dtheta
+                    dx = radius * (math.sin(theta + dtheta) - math.sin(theta))
+                    dy = -radius * (math.cos(theta + dtheta) - math.cos(theta))
+
+                successors.append((dx, dy, next_h, self.theta[next_h], step + cost_steer))
+            self.successors.append(successors)
+
+        # footprints[h] : heading h 로 회전시킨 충돌 검사용 원 중심 offset
+        self.footprints = []
+        for theta in self.theta:
+            c = math.cos(theta)
+            s = math.sin(theta)
+            self.footprints.append([(dl * c - dw * s, dl * s + dw * c) for dl, dw in disc_offsets])
+
+    def heading_index(self, theta):
+        return int(round(theta / self.heading_resolution)) % self.heading_samples
+
+    @staticmethod
+    def get(step, length, max_steer, steering_samples, heading_samples, disc_offsets):
+        key = (step, length, max_steer, steering_samples, heading_samples, tuple(disc_offsets))
+        if key not in _primitive_cache:
+            _primitive_cache[key] = MotionPrimitives(step, length, max_steer, steering_samples, heading_samples, disc_offsets)
+        return _primitive_cache[key]
+
 
 # total cost f(n) = actual cost g(n) + heuristic cost h(n)
 #                   노드간의 거리         노드에서 목적지까지 추정거리
 class hybrid_a_star:
     def __init__(self, min_x, max_x, min_y, max_y, \
-            obstacle=[], resolution=0.3, length=1.5, width = 0.8):
+            obstacle=[], resolution=0.3, length=1.5, width = 0.8, yaw_resolution=np.deg2rad(15.0), \
+            grid_resolution=0.1, shot_interval=5, heuristic_table=None, \
+            steering_samples=5, heading_samples=360, obstacle_index=None):
         self.min_x = min_x # / resolution
         self.max_x = max_x # / resolution
         self.min_y = min_y # / resolution
@@ -23,6 +80,30 @@ class hybrid_a_star:
         self.vehicle_length = length
         self.width = width
 
+        # state lattice : 한 step(resolution) 이동하면 항상 다른 (x, y) bin 으로 넘어가도록 설정
+        self.xy_resolution = resolution / math.sqrt(2)
+        self.yaw_bins = int(round(2 * math.pi / yaw_resolution))
+        self.yaw_resolution = 2 * math.pi / self.yaw_bins
+
+        # 장애물은 한 번만 격자에 그려두고, 거리장 조회(원 몇 개)로 먼저 판단
+        # 원으로 판단이 안 되는 장애물 근처에서만 사각형끼리 SAT 검사
+        self.outer_radius = math.hypot(length, width) / 2.0
+        self.disc_offsets, self.disc_radius = footprint_discs(length, width)
+        self.collision_map = CollisionMap(min_x, max_x, min_y, max_y, obstacle=obstacle,
+                                          resolution=grid_resolution, margin=math.hypot(length, width))
+        # 사각형 검사는 근처 장애물만 (obstacle 로 만든 ObstacleIndex 를 받으면 그대로 사용)
+        self.obstacle_index = obstacle_index if obstacle_index is not None else ObstacleIndex(obstacle)
+
+        # shot_interval 번 확장할 때마다 goal 까지 Dubins 경로를 한 번씩 시도
+        self.shot_interval = shot_interval
+
+        # 미리 계산해둔 non-holonomic heuristic table (NonHolonomicHeuristic)
+        self.heuristic_table = heuristic_table
+
+        # motion primitive : 조향 입력 개수, 주행 heading 을 나누는 개수 (기본 1 deg)
+        self.steering_samples = steering_samples
+        self.heading_samples = heading_samples
+
         ###
     def point_inside_obstacle_rectangle(self, point, obstacle):
         x = obstacle[0] #/self.resolution
@@ -56,112 +137,141 @@ class hybrid_a_star:
 
         return inside
 
+    def is_collision(self, x, y, theta, footprint=None):
+        if self.collision_map.distance_at(x, y) > self.outer_radius:
+            return False
+
+        if footprint is None:
+            c = math.cos(theta)
+            s = math.sin(theta)
+            footprint = [(dl * c - dw * s, dl * s + dw * c) for dl, dw in self.disc_offsets]
+
+        for ox, oy in footprint:
+            if self.collision_map.distance_at(x + ox, y + oy) <= self.disc_radius:
+                return self.obstacle_index.collides((x, y, theta, self.vehicle_length, self.width))
+        return False
+
+    def analytic_expansion(self, node, end, radius):
+        ''' node 에서 end 까지 충돌 없는 Dubins 경로 (node 제외, end 포함), 없으면 None '''
+        for _, mode, lengths in dubins_candidates(node, end, radius):
+            shot = sample_dubins(node, mode, lengths, radius, self.resolution)
+            if not all((self.min_x <= p[0] <= self.max_x) and (self.min_y <= p[1] <= self.max_y) for p in shot):
+                continue
+
+            # 경로 위 모든 점을 한 번에 검사
+            cars = [(p[0], p[1], p[2], self.vehicle_length, self.width) for p in shot]
+            if not self.obstacle_index.collision_matrix(cars).any():
+                shot[-1] = end
+                return shot
+        return None
+
+    def reconstruct_path(self, visited_diction, node):
+        rev_final_path = [] # reverse of final path
+        while node is not None:
+            _, _, node_c, parent_d = visited_diction[node]
+            rev_final_path.append(node_c)
+            node = parent_d
+
+        return rev_final_path[::-1]
+
     def euc_dist(self, position, target):
-        output = np.sqrt(((position[0] - target[0]) ** 2) + ((position[1] - target[1]) ** 2)) # +(math.radians(position[2]) - math.radians(target[2])) ** 2
-        return float(output)
+        return math.hypot(position[0] - target[0], position[1] - target[1])
+
+    def heuristic(self, node, end, non_holonomic, holonomic):
+        # 장애물 무시한 Dubins 길이와 장애물 고려한 격자 거리 중 큰 값
+        h_grid = holonomic.cost(node)
+        if h_grid == math.inf:
+            h_grid = self.euc_dist(node, end)
+        return max(non_holonomic.cost(node, end), h_grid)
 
     def costfunction(self, position, target):
         ratioDelta = 1
         output = ratioDelta * abs(position[2] - target[2])
         return float(output)
 
-    def find_path(self, start, end, max_steer = 20):
-        # max steering
-        steering_inputs = [0, -max_steer, max_steer]
-        cost_steering_inputs= [0, 0.3, 0.3]
+    def state_key(self, node):
+        # (x, y, heading) 를 격자 bin 으로 이산화 -> open/closed set 의 key
+        return (int(round((node[0] - self.min_x) / self.xy_resolution)),
+                int(round((node[1] - self.min_y) / self.xy_resolution)),
+                int(round(node[2] / self.yaw_resolution)) % self.yaw_bins)
 
-        speed_inputs = [self.resolution,-self.resolution]
-        cost_speed_inputs = [0,1]
+    def find_path(self, start, end, max_steer = 20):
+        primitives = MotionPrimitives.get(self.resolution, self.vehicle_length, max_steer,
+                                          self.steering_samples, self.heading_samples, self.disc_offsets)
 
-        start = (float(start[0]), float(start[1]), float(start[2])) # /resolution
-        end = (float(end[0]), float(end[1]), float(end[2]))
-        # start = (round(start[0]),round(start[1]),round(start[2]))
-        # end = (round(end[0]),round(end[1]),round(end[2]))
-        # The above 2 are in discrete coordinates
+        # start, end 는 degree 로 들어오고 내부에서는 radian 으로 계산
+        start = (float(start[0]), float(start[1]), math.radians(float(start[2])))
+        end = (float(end[0]), float(end[1]), math.radians(float(end[2])))
 
-        open_heap = [] # element of this list is like (cost,node_d) -->(cost,node_c)
-        open_diction={} #  element of this is like node_d:(cost,node_c,(parent_d,parent_c)) --> (cost,node_c,parent_c)
+        start_key = self.state_key(start)
+        turning_radius = self.vehicle_length / math.tan(math.radians(max_steer))
+        expansions = 0
 
-        visited_diction={} #  element of this is like node_d:(cost,node_c,(parent_d,parent_c)) --> (cost,node_c,parent_c)
-        cost_to_neighbour_from_start = 0
+        if self.heuristic_table is not None and self.heuristic_table.matches(turning_radius):
+            non_holonomic = self.heuristic_table
+        else:
+            non_holonomic = NonHolonomicHeuristic(turning_radius)
+        holonomic = HolonomicHeuristic(self.collision_map, self.min_x, self.max_x, self.min_y, self.max_y, end,
+                                       self.xy_resolution, min(self.vehicle_length, self.width) / 2.0)
 
-        hq.heappush(open_heap,(cost_to_neighbour_from_start + self.euc_dist(start, end), start))
+        open_heap = [] # element of this list is like (total_cost, node_d)
+        open_diction = {} # element of this is like node_d:(total_cost, cost, node_c, parent_d)
+        visited_diction = {} # closed set, same contents as open_diction
 
-        open_diction[start]=(cost_to_neighbour_from_start + self.euc_dist(start, end), start, start)
+        start_heuristic = self.heuristic(start, end, non_holonomic, holonomic)
+        hq.heappush(open_heap, (start_heuristic, start_key))
+        open_diction[start_key] = (start_heuristic, 0.0, start, None)
 
         start_time = time.time()
         while len(open_heap)>0:
-            chosen_c_node =  open_heap[0][1]
-            chosen_node_total_cost=open_heap[0][0]
-
-            visited_diction[chosen_c_node]=open_diction[chosen_c_node]
-
-            if self.euc_dist(chosen_c_node,end) < 2.0 * self.resolution:
-                rev_final_path=[end] # reverse of final path
-                node=chosen_c_node
-                m = 1
-                while m == 1:
-                    visited_diction
-                    open_node_contents=visited_diction[node] # (cost,node_c,(parent_d,parent_c))
-                    parent_of_node=open_node_contents[2]
-
-                    rev_final_path.append(parent_of_node)
-                    node=open_node_contents[2]
-
-                    if node == start:
-                        rev_final_path.append(start)
-                        break
-
-                final_path = []
-                for p in rev_final_path:
-                    final_path.insert(0,(p[0], p[1], math.radians(p[2]))) # x self.resolution
-
-                return final_path
-
-            hq.heappop(open_heap)
+            chosen_total_cost, chosen_d_node = hq.heappop(open_heap)
 
-            for i in range(0,3):
-                for j in range(1):
-                    delta=steering_inputs[i]
-                    velocity=speed_inputs[j]
+            # 같은 bin 이 더 낮은 비용으로 이미 확장된 경우
+            if chosen_d_node in visited_diction:
+                continue
 
-                    cost_to_neighbour_from_start =  chosen_node_total_cost-self.euc_dist(chosen_c_node, end)
+            visited_diction[chosen_d_node] = open_diction[chosen_d_node]
+            _, chosen_cost, chosen_c_node, _ = visited_diction[chosen_d_node]
 
-                    neighbour_x_cts = chosen_c_node[0] + (velocity * math.cos(math.radians(chosen_c_node[2])))
-                    neighbour_y_cts = chosen_c_node[1]  + (velocity * math.sin(math.radians(chosen_c_node[2])))
-                    neighbour_theta_cts = math.radians(chosen_c_node[2]) + (velocity * math.tan(math.radians(delta))/(float(self.vehicle_length)))
+            if self.euc_dist(chosen_c_node, end) < 2.0 * self.resolution:
+                return self.reconstruct_path(visited_diction, chosen_d_node) + [end]
 
-                    neighbour_theta_cts=math.degrees(neighbour_theta_cts)
-                    neighbour = ((neighbour_x_cts,neighbour_y_cts,neighbour_theta_cts))
-                    car = [neighbour_x_cts, neighbour_y_cts, np.deg2rad(neighbour_theta_cts), self.vehicle_length, self.width]
-                    # car_vertices = get_vertice_rect(car)
-                    if (all(not separating_axis_theorem(get_vertice_rect(car), get_vertice_rect(obs)) for obs in self.obstacle) and \
-                            (neighbour_x_cts >= self.min_x) and (neighbour_x_cts <= self.max_x) and \
-                            (neighbour_y_cts >= self.min_y) and (neighbour_y_cts <= self.max_y)):
+            # goal 방향까지 정확히 맞춰서 바로 합류할 수 있으면 탐색 종료
+            if expansions % self.shot_interval == 0:
+                shot = self.analytic_expansion(chosen_c_node, end, turning_radius)
+                if shot is not None:
+                    return self.reconstruct_path(visited_diction, chosen_d_node) + shot
+            expansions += 1
 
-                            heurestic = self.euc_dist((neighbour_x_cts,neighbour_y_cts,neighbour_theta_cts),end)
-                            cost_to_neighbour_from_start = abs(velocity)+ cost_to_neighbour_from_start +\
-                                                                         cost_steering_inputs[i] + cost_speed_inputs[j]
+            chosen_x, chosen_y = chosen_c_node[0], chosen_c_node[1]
+            for dx, dy, next_h, next_theta, step_cost in primitives.successors[primitives.heading_index(chosen_c_node[2])]:
+                neighbour_x_cts = chosen_x + dx
+                neighbour_y_cts = chosen_y + dy
 
-                            total_cost = heurestic+cost_to_neighbour_from_start
+                neighbour = (neighbour_x_cts, neighbour_y_cts, next_theta)
+                neighbour_d = self.state_key(neighbour)
 
-                            skip=0
-                            found_lower_cost_path_in_open = 0
+                if neighbour_d in visited_diction:
+                    continue
 
-                            if neighbour in open_diction:
+                if not ((neighbour_x_cts >= self.min_x) and (neighbour_x_cts <= self.max_x) and \
+                        (neighbour_y_cts >= self.min_y) and (neighbour_y_cts <= self.max_y)):
+                    continue
 
-                                if total_cost>open_diction[neighbour][0]:
-                                    skip=1
+                if self.is_collision(neighbour_x_cts, neighbour_y_cts, next_theta, primitives.footprints[next_h]):
+                    continue
 
-                                elif neighbour in visited_diction:
+                heurestic = self.heuristic(neighbour, end, non_holonomic, holonomic)
+                cost_to_neighbour_from_start = chosen_cost + step_cost
 
-                                    if total_cost>visited_diction[neighbour][0]:
-                                        found_lower_cost_path_in_open=1
+                total_cost = heurestic + cost_to_neighbour_from_start
 
+                # 같은 bin 에 더 싼 연속 상태가 이미 open 에 있으면 skip
+                if neighbour_d in open_diction and total_cost >= open_diction[neighbour_d][0]:
+                    continue
 
-                            if skip==0 and found_lower_cost_path_in_open==0:
-                                hq.heappush(open_heap, (total_cost,neighbour))
-                                open_diction[neighbour]=(total_cost, neighbour, chosen_c_node)
+                hq.heappush(open_heap, (total_cost, neighbour_d))
+                open_diction[neighbour_d] = (total_cost, cost_to_neighbour_from_start, neighbour, chosen_d_node)
 
             if time.time() - start_time > 1.5:
                 return None
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Table-driven mission state machine for the Core node. Each driving mode
+# maps mission status -> ordered rules (guard, actions, next status), so a
+# tick is a dict lookup on (mode, status) plus the few rules of that state.
+# Timers are read from the `now` passed to step() (ROS clock in Core, any
+# monotonic seconds in a replay), and nothing here imports rclpy, so a
+# recorded or synthetic input sequence can be stepped as fast as Python runs.
+#
+# Rule semantics follow the if / elif blocks they replace: rules of a state
+# are tried in order and every rule whose guard holds fires (a later goto
+# wins), `last=True` skips the remaining rules (elif), and `chain=True` runs
+# the new state's rules in the same tick.
+
+from collections import namedtuple
+
+from autocar_nav.streaming_stats import MajorityVote
+
+
+ANY = '*' # 표에 없는 status 일 때 (기존 else 블록)
+
+Rule = namedtuple('Rule', ['guard', 'actions', 'goto', 'last', 'chain'])
+
+MissionInputs = namedtuple('MissionInputs', [
+    'mode', 'link_num', 'waypoint', 'traffic_stop_wp', 'parking_stop_wp', 'next_path',
+    'steer', 'cte_term', 'obstacle_detected', 'obstacle', 'obs_distance', 'track_steer',
+    'yolo_light', 'distance', 'sign_pose'],
+    defaults=('global', 0, 0, 1e3, 1e3, 'straight', 0.0, 0.0, 0, 'None', 1e3, 0.0, ('None',), -1.0, 0))
+
+MissionCommand = namedtuple('MissionCommand', ['speed', 'steer', 'gear', 'status', 'traffic_stop'])
+
+
+def when(guard, *actions, goto=None, last=False, chain=False):
+    ''' guard(c) 가 참이면 actions 실행 후 status 를 goto 로 '''
+    return Rule(guard, actions, goto, last, chain)
+
+
+def always(*actions, goto=None, last=False, chain=False):
+    return Rule(None, actions, goto, last, chain)
+
+
+class MissionContext:
+    ''' rule 들이 읽고 쓰는 값, 입력에 없는 이름은 현재 MissionInputs 에서 찾음 '''
+    def __init__(self, target_speed):
+        self.inputs = MissionInputs()
+        self.target_speed = target_speed
+        self.now = 0.0
+
+        self.status = 'driving'
+        self.cmd_speed = 0.0
+        self.cmd_steer = 0.0
+        self.gear = 0.0
+        self.traffic_stop = False
+        self.traffic_pass = False
+        self.mission_count = 0
+        self.stop_wp = 1e3
+        self.timers = {}
+
+    def __getattr__(self, name):
+        return getattr(self.inputs, name)
+
+    def restart(self, timer):
+        self.timers[timer] = self.now
+
+    def elapsed(self, timer):
+        ''' 한 번도 시작하지 않은 timer 는 아주 오래 전에 시작한 것으로 '''
+        return self.now - self.timers.get(timer, float('-inf'))
+
+
+# ---------------------------------------------------------------- actions
+
+def speed(name):
+    def action(c):
+        c.cmd_speed = c.target_speed[name]
+    return action
+
+
+def steer(value):
+    def action(c):
+        c.cmd_steer = value
+    return action
+
+
+def gear(value):
+    def action(c):
+        c.gear = value
+    return action
+
+
+def restart(timer):
+    def action(c):
+        c.restart(timer)
+    return action
+
+
+def halt(c):
+    c.cmd_speed = 0.0
+    c.cmd_steer = 0.0
+
+
+def follow_track(c):
+    c.cmd_steer = c.track_steer
+
+
+def count_mission(c):
+    c.mission_count += 1
+
+
+def mark_stop_wp(c):
+    c.stop_wp = c.waypoint + int(c.distance)
+
+
+def identify_traffic_light(c):
+    if c.next_path == 'straight': tf_light = ('Green', 'Straightleft', 'None')
+    elif c.next_path == 'left': tf_light = ('Left', 'Straightleft', 'None')
+    elif c.next_path == 'right':
+        if c.elapsed('pause') < 3.5:
+            tf_light = ()
+        else:
+            tf_light = ('Green', 'Left', 'Red', 'Straightleft', 'Yellow', 'None')
+    else: tf_light = ('Green', 'Left', 'Red', 'Straightleft', 'Yellow', 'None')
+
+    if c.link_num == 6 and 'Left' in c.yolo_light:
+        c.traffic_pass = True
+    elif c.link_num != 6:
+        c.traffic_pass = False
+
+    if not any(light in tf_light for light in c.yolo_light):
+        c.traffic_stop = not c.traffic_pass
+    else:
+        c.traffic_stop = False
+
+
+def traffic_light(*windows):
+    ''' traffic_stop_wp 가 windows (lo, hi) 중 하나 안이면 신호 확인, 아니면 정지 해제 '''
+    def action(c):
+        if any(lo <= c.traffic_stop_wp <= hi for lo, hi in windows):
+            identify_traffic_light(c)
+        else:
+            c.traffic_stop = False
+            c.restart('pause')
+    return action
+
+
+# ---------------------------------------------------------------- missions
+
+STATIC_AVOID = (
+    when(lambda c: c.obstacle_detected, restart('avoid')),
+    when(lambda c: c.elapsed('avoid') >= 3, goto='check'),
+)
+
+STATIC1_COMPLETE = (
+    always(speed('traffic'), traffic_light((3, 8))),
+)
+
+DELIVERY_STOP = (
+    always(halt),
+    when(lambda c: c.elapsed('parking') >= 5, goto='complete'),
+)
+
+MISSION_TABLE = {
+    'global': {
+        ANY: (
+            always(goto='driving'),
+            when(lambda c: c.link_num == 3, speed('traffic')),
+            when(lambda c: c.link_num == 7 and c.traffic_stop_wp <= 40, speed('curve')),
+            when(lambda c: c.next_path != 'none' and c.traffic_stop_wp <= 15, speed('traffic'), traffic_light((3, 8))),
+        ),
+    },
+
+    'uturn': {
+        'driving': (
+            when(lambda c: c.traffic_stop_wp <= 0, goto='complete'),
+            when(lambda c: c.waypoint >= 20 and c.obs_distance < 15, speed('track')),
+            when(lambda c: c.waypoint >= 20 and c.obs_distance < 7, goto='track'),
+        ),
+        'track': (
+            always(speed('track'), follow_track),
+            when(lambda c: c.waypoint > 230 and abs(c.cte_term) <= 10, restart('avoid'), goto='complete'),
+        ),
+        ANY: (
+            when(lambda c: c.elapsed('avoid') < 2, speed('track')),
+        ),
+    },
+
+    'tunnel': {
+        'driving': (
+            when(lambda c: c.waypoint >= 15, goto='lanenet'),
+        ),
+        'lanenet': (
+            when(lambda c: c.obstacle == 'dynamic', count_mission, restart('avoid'), goto='stop'),
+            when(lambda c: c.obstacle == 'static', count_mission, restart('avoid'), goto='avoid'),
+            when(lambda c: c.traffic_stop_wp <= 35, goto='complete'),
+        ),
+        'stop': (
+            always(halt),
+            when(lambda c: c.obstacle == 'dynamic', restart('avoid')),
+            when(lambda c: c.elapsed('avoid') >= 1.5, goto='lanenet'),
+        ),
+        'avoid': (
+            always(speed('static0')),
+            when(lambda c: c.obstacle == 'static', restart('avoid')),
+            when(lambda c: c.elapsed('avoid') >= 3, goto='lanenet'),
+        ),
+    },
+
+    'static0': {
+        'driving': (
+            always(speed('tunnel')),
+            when(lambda c: c.waypoint >= 20, goto='check'),
+        ),
+        'check': (
+            always(speed('tunnel')),
+            when(lambda c: 25 <= c.waypoint <= 57, speed('static0'), last=True),
+            when(lambda c: c.traffic_stop_wp < 30, goto='complete', last=True),
+            when(lambda c: c.obstacle_detected, restart('avoid'), goto='avoid'),
+        ),
+        'avoid': STATIC_AVOID,
+        ANY: (
+            always(speed('traffic'), traffic_light((3, 7), (19, 23))),
+        ),
+    },
+
+    'static1': {
+        # driving 은 check 로 넘어가면 같은 tick 에 check 를, 아니면 complete 블록을 같이 실행
+        'driving': (
+            when(lambda c: c.waypoint >= 20, goto='check', last=True, chain=True),
+        ) + STATIC1_COMPLETE,
+        'check': (
+            always(speed('tunnel')),
+            when(lambda c: c.traffic_stop_wp <= 15, goto='complete', last=True),
+            when(lambda c: c.obstacle_detected, restart('avoid'), goto='avoid'),
+        ),
+        'avoid': STATIC_AVOID,
+        ANY: STATIC1_COMPLETE,
+    },
+
+    'revpark': {
+        'driving': (
+            when(lambda c: c.traffic_stop_wp <= 8, restart('parking'), goto='parking'),
+            when(lambda c: c.waypoint >= 60, goto='complete'),
+        ),
+        'parking': (
+            always(speed('parking'), gear(2.0)),
+            when(lambda c: c.elapsed('parking') < 2, halt, last=True),
+            when(lambda c: c.parking_stop_wp <= 7, restart('parking'), goto='return'),
+        ),
+        'return': (
+            always(speed('parking'), gear(0.0)),
+            when(lambda c: c.elapsed('parking') <= 11, halt, last=True),
+            when(lambda c: c.parking_stop_wp <= 9, steer(0.45), last=True),
+            when(lambda c: c.parking_stop_wp >= 21, goto='complete'),
+        ),
+        ANY: (
+            always(speed('global')),
+        ),
+    },
+
+    'delivery_A': {
+        'driving': (
+            when(lambda c: c.waypoint > 45, goto='check', last=True),
+            when(lambda c: c.waypoint < 25, speed('regular')),
+        ),
+        'check': (
+            when(lambda c: c.distance != -1, mark_stop_wp, goto='detected'),
+            when(lambda c: c.sign_pose >= 500, restart('parking'), goto='stop'),
+            when(lambda c: c.traffic_stop_wp <= 20, goto='complete'),
+        ),
+        'detected': (
+            when(lambda c: c.stop_wp - c.waypoint <= 0, restart('parking'), goto='stop', last=True),
+            when(lambda c: c.traffic_stop_wp <= 15, goto='complete'),
+        ),
+        'stop': DELIVERY_STOP,
+        ANY: (
+            always(speed('curve')),
+        ),
+    },
+
+    'delivery_B': {
+        'driving': (
+            when(lambda c: c.waypoint > 45, goto='check', last=True),
+            when(lambda c: c.waypoint < 23, speed('regular')),
+        ),
+        'check': (
+            when(lambda c: c.distance != -1, mark_stop_wp, goto='detected'),
+            when(lambda c: c.traffic_stop_wp <= 70, goto='complete'),
+        ),
+        'detected': (
+            when(lambda c: c.stop_wp - c.waypoint <= 0, restart('parking'), goto='stop', last=True),
+            when(lambda c: c.traffic_stop_wp <= 55, goto='complete'),
+        ),
+        'stop': DELIVERY_STOP,
+        ANY: (
+            always(speed('curve')),
+            when(lambda c: c.traffic_stop_wp <= 20, speed('traffic')),
+            always(traffic_light((3, 8))),
+        ),
+    },
+
+    'finish': {
+        ANY: (
+            when(lambda c: c.traffic_stop_wp <= 0, halt, goto='complete'),
+        ),
+    },
+}
+
+
+class MissionEngine:
+    def __init__(self, target_speed, table=MISSION_TABLE, queue_size=35):
+        '''
+        target_speed : mode 이름 -> 속도 [m/s], table : mode -> status -> rules
+        queue_size   : link 변경 판단에 쓰는 최근 link_num 개수
+        '''
+        self.table = table
+        self.context = MissionContext(target_speed)
+        self.link_history = MajorityVote(queue_size, fill=0)
+
+    @property
+    def status(self):
+        return self.context.status
+
+    def observe_link(self, link_num):
+        ''' /autocar/mode 를 받을 때마다 '''
+        self.link_history.append(link_num)
+
+    def step(self, inputs, now):
+        '''
+        inputs : MissionInputs, now : 현재 시각 [s]
+        return : MissionCommand
+        '''
+        c = self.context
+        c.inputs, c.now = inputs, now
+        c.cmd_speed = c.target_speed[inputs.mode]
+        c.cmd_steer = inputs.steer
+
+        # 최근 link 다수결과 다르면 새 link 에 들어온 것
+        if self.link_history.mode() != inputs.link_num:
+            c.status = 'driving'
+            c.traffic_stop = False
+            c.restart('pause')
+
+        states = self.table.get(inputs.mode)
+        if states is not None:
+            for _ in range(len(states)):
+                if not self.run(states.get(c.status, states.get(ANY, ()))):
+                    break
+
+        return MissionCommand(c.cmd_speed, c.cmd_steer, c.gear, c.status, c.traffic_stop)
+
+    def run(self, rules):
+        ''' return : chain 규칙으로 status 가 바뀌었으면 True '''
+        c = self.context
+        chained = False
+        for rule in rules:
+            if rule.guard is None or rule.guard(c):
+                for action in rule.actions:
+                    action(c)
+                if rule.goto is not None:
+                    c.status = rule.goto
+                chained = chained or rule.chain
+                if rule.last: break
+        return chained
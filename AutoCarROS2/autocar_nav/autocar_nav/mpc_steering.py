@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Linear MPC for steering. The kinematic bicycle model is linearised around
+# the reference path in path coordinates (lateral error, heading error) and
+# condensed over the horizon, which leaves a small box-constrained QP in the
+# steering sequence only. It is solved with accelerated projected gradient
+# (FISTA), warm-started from the previous solution shifted by one step, so
+# a solve is a few dozen 20x20 mat-vecs and needs no QP library.
+#
+#   python3 mpc_steering.py [map] [speed km/h] [delay steps]   # 맵(기본 kcity)에서 Stanley 와 비교
+
+import time
+import numpy as np
+
+
+class LinearMPC:
+    def __init__(self, wheelbase, max_steer, dt, horizon=20, q_lateral=1.0, q_heading=1.0,
+                 r_steer=0.1, r_rate=0.5, delay_steps=0, max_iter=100, tol=1e-5):
+        '''
+        wheelbase : 앞뒤 축 거리 [m], max_steer : 조향 한계 [rad], dt : 제어 주기 [s]
+        q_* : 오차 가중치, r_steer : 경로 곡률 조향과의 차이 가중치, r_rate : 조향 변화량 가중치
+        delay_steps : 명령이 실제 조향에 반영되기까지의 제어 주기 수 (이미 보낸 명령으로 상태를 먼저 예측)
+        '''
+        self.L = wheelbase
+        self.max_steer = max_steer
+        self.dt = dt
+        self.N = horizon
+        self.q = np.tile([q_lateral, q_heading], horizon)
+        self.r_steer = r_steer
+        self.r_rate = r_rate
+        self.delay_steps = delay_steps
+        self.max_iter = max_iter
+        self.tol = tol
+
+        # 조향 변화량 (u_k - u_k-1) 행렬
+        self.D = np.eye(horizon) - np.eye(horizon, k=-1)
+        self.DtD = self.D.T @ self.D
+
+        k = np.arange(1, horizon + 1)[:, None]
+        j = np.arange(horizon)[None, :]
+        self.steps = np.where(j < k, k - 1 - j, -1) # A^(k-1-j), 영향 없는 칸은 -1
+
+        self.solution = None
+        self.pending = [] # 보냈지만 아직 반영되지 않은 명령, 오래된 것부터
+
+    def reset(self):
+        ''' warm start 초기화 (path 나 주행 방향이 바뀔 때) '''
+        self.solution = None
+        self.pending = []
+
+    def prediction_matrices(self, vel):
+        ''' Z = Sx z0 + Su (U - Uref), Z = [e_y1, e_psi1, ..., e_yN, e_psiN] '''
+        h = vel * self.dt
+        N = self.N
+
+        Sx = np.zeros((2 * N, 2))
+        Sx[0::2, 0] = 1.0
+        Sx[0::2, 1] = h * np.arange(1, N + 1)
+        Sx[1::2, 1] = 1.0
+
+        # A^m B = [m * h * h / L, h / L]
+        active = self.steps >= 0
+        Su = np.zeros((2 * N, N))
+        Su[0::2] = np.where(active, self.steps * h * h / self.L, 0.0)
+        Su[1::2] = np.where(active, h / self.L, 0.0)
+        return Sx, Su
+
+    def solve(self, lateral_error, heading_error, vel, curvature, prev_steer=0.0):
+        '''
+        lateral_error : 경로 기준 왼쪽 + [m], heading_error : yaw - 경로 yaw [rad]
+        curvature     : 지금부터 delay_steps + N 주기 동안 지나갈 경로의 곡률 (좌회전 +), 짧으면 마지막 값으로 채움
+        prev_steer    : 직전 조향 명령, 변화량 비용에 사용
+        return : 첫 조향 명령 [rad], 반복 횟수
+        '''
+        Sx, Su = self.prediction_matrices(vel)
+        h = vel * self.dt
+
+        curvature = np.asarray(curvature, dtype=float)
+        total = self.delay_steps + self.N
+        if len(curvature) < total:
+            curvature = np.append(curvature, np.full(total - len(curvature), curvature[-1] if len(curvature) > 0 else 0.0))
+        u_ref = np.arctan(self.L * curvature) # 경로를 그대로 따라가는 조향
+
+        # 이미 보낸 명령이 반영되는 동안의 오차를 먼저 예측
+        lateral_error, heading_error = float(lateral_error), float(heading_error)
+        pending = [prev_steer] * (self.delay_steps - len(self.pending)) + self.pending
+        for k, u_p in enumerate(pending):
+            lateral_error += h * heading_error
+            heading_error += h / self.L * (u_p - u_ref[k])
+        if pending:
+            prev_steer = pending[-1]
+
+        z0 = np.array([lateral_error, heading_error])
+        u_ref = u_ref[self.delay_steps:]
+
+        QSu = Su * self.q[:, None]
+        H = Su.T @ QSu + self.r_steer * np.eye(self.N) + self.r_rate * self.DtD
+        d0 = np.zeros(self.N)
+        d0[0] = prev_steer
+        f = QSu.T @ (Sx @ z0 - Su @ u_ref) - self.r_steer * u_ref - self.r_rate * (self.D.T @ d0)
+
+        step = 1.0 / np.linalg.eigvalsh(H)[-1]
+
+        if self.solution is None:
+            u = np.clip(u_ref, -self.max_steer, self.max_steer)
+        else:
+            u = np.append(self.solution[1:], self.solution[-1]) # 한 칸 밀어서 warm start
+
+        # FISTA : 기울기 한 번 + box 로 projection
+        y, t = u.copy(), 1.0
+        for it in range(1, self.max_iter + 1):
+            u_next = np.clip(y - step * (H @ y + f), -self.max_steer, self.max_steer)
+            t_next = 0.5 * (1.0 + np.sqrt(1.0 + 4.0 * t * t))
+            y = u_next + ((t - 1.0) / t_next) * (u_next - u)
+
+            converged = np.max(np.abs(u_next - u)) < self.tol
+            u, t = u_next, t_next
+            if converged: break
+
+        self.solution = u
+        if self.delay_steps > 0:
+            self.pending = (pending + [float(u[0])])[-self.delay_steps:]
+        return float(u[0]), it
+
+
+def stanley_steer(x, y, yaw, vel, cx, cy, cyaw, index, k=1.0, ksoft=0.1):
+    ''' tracker.py 의 global 모드 Stanley (front axle 기준) '''
+    dx, dy = x - cx[index], y - cy[index]
+    crosstrack_error = dx * np.sin(yaw) - dy * np.cos(yaw)
+    heading_error = np.arctan2(np.sin(cyaw[index] - yaw), np.cos(cyaw[index] - yaw))
+    return np.arctan2(k * crosstrack_error, ksoft + vel) + heading_error
+
+
+def main():
+    import os
+    import sys
+    from autocar_nav.cubic_spline_interpolator import generate_cubic_path
+    from autocar_nav.path_index import PathIndex
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'autocar_map', 'path'))
+    try:
+        from ament_index_python.packages import get_package_share_directory
+        sys.path.append(os.path.join(get_package_share_directory('autocar_map'), 'path'))
+    except (ImportError, LookupError):
+        pass
+    import path_link
+
+    name = sys.argv[1] if len(sys.argv) > 1 else 'kcity'
+    speed = (float(sys.argv[2]) if len(sys.argv) > 2 else 15.0) / 3.6
+    delays = [int(sys.argv[3])] if len(sys.argv) > 3 else [0, 2]
+    track = path_link.load_map(name)
+
+    gx, gy = [], []
+    for i in range(len(track.car_mode)):
+        key = 'global_' + str(i)
+        gx += track.global_map_x[key]
+        gy += track.global_map_y[key]
+    keep = np.concatenate(([True], np.hypot(np.diff(gx), np.diff(gy)) > 1e-3))
+    cx, cy, cyaw, ck = [np.asarray(a) for a in generate_cubic_path(np.asarray(gx)[keep].tolist(), np.asarray(gy)[keep].tolist(), ds=0.1)]
+    cs = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(cx), np.diff(cy)))))
+
+    L, FL, max_steer, dt = 1.04, 1.04, 0.42, 0.1 # navigation_params.yaml 의 path_tracker 값
+
+    def run(controller, delay):
+        mpc = LinearMPC(L, max_steer, dt, delay_steps=delay)
+        front_index, rear_index = PathIndex(cx, cy), PathIndex(cx, cy)
+        x, y, yaw, steer = cx[0] - 0.5 * np.sin(cyaw[0]), cy[0] + 0.5 * np.cos(cyaw[0]), cyaw[0], 0.0 # 왼쪽 0.5 m 에서 출발
+        errors, solve_times, iterations = [], [], []
+        commands = [0.0] * delay # 조향 구동 지연
+
+        while True:
+            i = rear_index.nearest(x, y)
+            if i >= len(cx) - 2: break
+            lateral_error = -(x - cx[i]) * np.sin(cyaw[i]) + (y - cy[i]) * np.cos(cyaw[i])
+            errors.append(lateral_error)
+
+            t0 = time.perf_counter()
+            if controller == 'mpc':
+                heading_error = np.arctan2(np.sin(yaw - cyaw[i]), np.cos(yaw - cyaw[i]))
+                curvature = np.interp(cs[i] + speed * dt * np.arange(delay + mpc.N), cs, ck)
+                steer, it = mpc.solve(lateral_error, heading_error, speed, curvature, steer)
+                iterations.append(it)
+            else:
+                fx, fy = x + FL * np.cos(yaw), y + FL * np.sin(yaw)
+                steer = stanley_steer(fx, fy, yaw, speed, cx, cy, cyaw, front_index.nearest(fx, fy))
+            solve_times.append(time.perf_counter() - t0)
+            steer = float(np.clip(steer, -max_steer, max_steer))
+            commands.append(steer)
+            applied = commands.pop(0)
+
+            # rear axle 기준 kinematic bicycle
+            x += speed * np.cos(yaw) * dt
+            y += speed * np.sin(yaw) * dt
+            yaw += speed * np.tan(applied) / L * dt
+
+        errors = np.abs(errors)
+        settled = errors[int(3.0 / dt):] # 출발 오차가 줄어든 뒤
+        print('%-8s delay %d  rms %.3f m  max %.3f m (after 3 s)  solve mean %.3f ms  max %.3f ms%s' % (
+            controller, delay, np.sqrt(np.mean(settled ** 2)), np.max(settled),
+            1e3 * np.mean(solve_times), 1e3 * np.max(solve_times),
+            '  iterations mean %.1f' % np.mean(iterations) if iterations else ''))
+
+    print('%s : %.0f m, %.1f km/h, dt %.1f s' % (name, cs[-1], speed * 3.6, dt))
+    for delay in delays:
+        run('stanley', delay)
+        run('mpc', delay)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Seconds-as-float view of the node clock for timeouts and timestamp
+# buffers. NodeClock follows the node's use_sim_time, so `ros2 bag play
+# --rate 5` or a faster-than-realtime simulator advances every timer at the
+# replay rate instead of wall time. ManualClock gives the same now / since
+# stepped by hand, without rclpy (test/test_mission.py replays on it).
+
+
+class NodeClock:
+    def __init__(self, node):
+        self.clock = node.get_clock()
+
+    def now(self):
+        ''' 현재 시각 [s], use_sim_time 이면 /clock 기준 '''
+        return self.clock.now().nanoseconds * 1e-9
+
+    def since(self, t):
+        ''' t [s] 부터 지난 시간 [s] '''
+        return self.now() - t
+
+    def stamp(self):
+        ''' header.stamp 에 넣을 현재 시각 '''
+        return self.clock.now().to_msg()
+
+
+class ManualClock:
+    def __init__(self, start=0.0):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    def since(self, t):
+        return self.t - t
+
+    def advance(self, dt):
+        self.t += dt
+        return self.t
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Uniform-grid spatial index over obstacle boxes (x, y, yaw, length, width).
+# Every box is registered in the cells covered by its bounding circle, so a
+# query only has to look at the cells around the query pose. Build it once
+# per obstacle message and reuse it for every collision check of that tick.
+
+import math
+import numpy as np
+
+from autocar_nav.obb_collision import as_boxes, collision_matrix, rect_overlap
+
+
+class ObstacleIndex:
+    def __init__(self, boxes, cell_size=2.0):
+        self.boxes = as_boxes(boxes)
+        self.box_list = [tuple(box) for box in self.boxes.tolist()]
+        self.cell_size = cell_size
+
+        # cells[(ix, iy)] : 그 cell 에 외접원이 걸치는 box index 들
+        self.cells = {}
+        radius = np.hypot(self.boxes[:, 3], self.boxes[:, 4]) / 2.0
+        for k in range(len(self.boxes)):
+            x, y, r = self.boxes[k, 0], self.boxes[k, 1], radius[k]
+            for ix in range(self.cell(x - r), self.cell(x + r) + 1):
+                for iy in range(self.cell(y - r), self.cell(y + r) + 1):
+                    self.cells.setdefault((ix, iy), []).append(k)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def cell(self, v):
+        return int(math.floor(v / self.cell_size))
+
+    def query(self, x, y, radius):
+        ''' (x, y) 반지름 radius 원 근처에 있는 box 의 index (정렬된 list) '''
+        found = set()
+        for ix in range(self.cell(x - radius), self.cell(x + radius) + 1):
+            for iy in range(self.cell(y - radius), self.cell(y + radius) + 1):
+                found.update(self.cells.get((ix, iy), ()))
+        return sorted(found)
+
+    def collides(self, car):
+        ''' 사각형 car (x, y, yaw, length, width) 하나가 근처 box 중 하나와라도 겹치는지 '''
+        for k in self.query(car[0], car[1], math.hypot(car[3], car[4]) / 2.0):
+            if rect_overlap(car, self.box_list[k]):
+                return True
+        return False
+
+    def candidates(self, cars):
+        ''' cars (N, 5) 중 하나라도 가까이 있는 box 의 index array '''
+        cars = as_boxes(cars)
+        found = set()
+        for x, y, _, length, width in cars:
+            found.update(self.query(x, y, math.hypot(length, width) / 2.0))
+        return np.array(sorted(found), dtype=int)
+
+    def collision_matrix(self, cars, boxes=None):
+        '''
+        obb_collision.collision_matrix 와 같은 (N, M) 결과, 근처 box 만 검사.
+        boxes : 같은 순서로 크기만 바꾼 box 를 쓰고 싶을 때 (index 의 box 보다 크면 안 됨)
+        '''
+        cars = as_boxes(cars)
+        boxes = self.boxes if boxes is None else as_boxes(boxes)
+        collide = np.zeros((len(cars), len(boxes)), dtype=bool)
+        if len(cars) == 0 or len(boxes) == 0:
+            return collide
+
+        near = self.candidates(cars)
+        if len(near) > 0:
+            collide[:, near] = collision_matrix(cars, boxes[near])
+        return collide
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Nearest-waypoint lookup along a fixed path. After the first fix only a
+# small window around the previous index is searched, mostly ahead of it,
+# so lookups are O(window) and cannot jump to another part of a
+# self-intersecting map. A KD-tree over the whole path is used to
+# (re)localize when there is no previous index or the window lost the car.
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class PathIndex:
+    def __init__(self, x, y, behind=5, ahead=30, relocalize_dist=5.0):
+        '''
+        behind, ahead   : 이전 index 기준 탐색 window (waypoint 개수)
+        relocalize_dist : window 안 가장 가까운 점이 이보다 멀면 전체 path 에서 다시 찾음 [m]
+        '''
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.behind = behind
+        self.ahead = ahead
+        self.relocalize_dist = relocalize_dist
+
+        self.tree = None # 처음 relocalize 할 때 생성
+        self.last = None
+
+    def __len__(self):
+        return len(self.x)
+
+    def reset(self, index=None):
+        ''' 다음 탐색을 index 주변에서 시작 (None 이면 전체 path 에서) '''
+        self.last = index
+
+    def relocalize(self, px, py):
+        if self.tree is None:
+            self.tree = cKDTree(np.column_stack((self.x, self.y)))
+        _, index = self.tree.query((px, py))
+        self.last = int(index)
+        return self.last
+
+    def nearest(self, px, py):
+        ''' (px, py) 에서 가장 가까운 waypoint 의 index '''
+        if self.last is None:
+            return self.relocalize(px, py)
+
+        n = len(self.x)
+        lo = max(self.last - self.behind, 0)
+        while True:
+            hi = min(self.last + self.ahead + 1, n)
+            d = np.hypot(self.x[lo:hi] - px, self.y[lo:hi] - py)
+            index = lo + int(np.argmin(d))
+
+            # window 끝에서 최소가 나오면 window 를 앞으로 밀어서 다시 탐색
+            if index == hi - 1 and hi < n and index != self.last:
+                self.last = index
+                lo = index
+                continue
+            break
+
+        if d[index - lo] > self.relocalize_dist:
+            return self.relocalize(px, py)
+
+        self.last = index
+        return index
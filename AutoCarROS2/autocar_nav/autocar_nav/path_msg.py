@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Conversion between numpy arrays and autocar_msgs/CompactPath2D.
+# rclpy keeps float64[] fields as array.array('d'), so filling a message is
+# one memcpy per field and reading it back is a zero-copy numpy view.
+
+import array
+import numpy as np
+
+from autocar_msgs.msg import CompactPath2D
+
+
+def to_float64_array(values):
+    ''' list 또는 numpy array -> message 의 float64[] field 에 바로 넣을 수 있는 array.array('d') '''
+    out = array.array('d')
+    out.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return out
+
+
+def path_to_msg(x, y, theta=None):
+    ''' x, y, theta 배열로 CompactPath2D 생성, theta 를 생략하면 0 '''
+    msg = CompactPath2D()
+    msg.x = to_float64_array(x)
+    msg.y = to_float64_array(y)
+    msg.theta = to_float64_array(np.zeros(len(msg.x)) if theta is None else theta)
+    return msg
+
+
+def msg_to_arrays(msg):
+    ''' CompactPath2D -> (x, y, theta) numpy array, message 버퍼를 복사하지 않으므로 수정하지 말 것 '''
+    return (np.frombuffer(msg.x, dtype=np.float64),
+            np.frombuffer(msg.y, dtype=np.float64),
+            np.frombuffer(msg.theta, dtype=np.float64))
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# sensor_msgs/PointCloud2 as a numpy structured array. The dtype is built
+# from the message's own field offsets and point_step, so reading a cloud is
+# a zero-copy view of msg.data instead of one Python tuple per point
+# (point_cloud2.read_points), and filters become boolean masks. Ring / box
+# regions, per-ring splits, summary statistics and sub-cloud encoding are
+# shared by Localization (tunnel exit) and the ring_extractor node.
+
+import array
+import numpy as np
+from collections import namedtuple
+
+from sensor_msgs.msg import PointCloud2, PointField
+
+
+# sensor_msgs/PointField datatype -> numpy type
+POINTFIELD_DTYPES = {1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4', 7: 'f4', 8: 'f8'}
+DTYPE_POINTFIELDS = {value: key for key, value in POINTFIELD_DTYPES.items()}
+
+# rings : 고를 ring 번호 (빈 tuple 이면 전부), x / y / z : (하한, 상한) 열린 구간 [m]
+Region = namedtuple('Region', ['rings', 'x', 'y', 'z'],
+                    defaults=((), (-np.inf, np.inf), (-np.inf, np.inf), (-np.inf, np.inf)))
+
+# VLP-16 ring 15 중 차량 오른쪽 앞 위쪽 (터널 천장), 몇 개 안 남으면 터널 밖
+TUNNEL_CEILING = Region(rings=(15,), x=(0.0, 10.0), y=(-np.inf, 0.0), z=(2.0, np.inf))
+
+CloudStats = namedtuple('CloudStats', ['count', 'z_min', 'z_mean', 'z_max', 'range_min'])
+
+
+def cloud_dtype(msg, field_names):
+    ''' msg 의 field 중 field_names 만 골라 offset 그대로 둔 structured dtype '''
+    fields = {field.name: field for field in msg.fields}
+    missing = [name for name in field_names if name not in fields]
+    if missing:
+        raise KeyError('PointCloud2 has no field {} (fields : {})'.format(', '.join(missing), ', '.join(fields)))
+
+    order = '>' if msg.is_bigendian else '<'
+    return np.dtype({
+        'names': list(field_names),
+        'formats': [order + POINTFIELD_DTYPES[fields[name].datatype] for name in field_names],
+        'offsets': [fields[name].offset for name in field_names],
+        'itemsize': msg.point_step,
+    })
+
+
+def cloud_to_array(msg, field_names=('x', 'y', 'z')):
+    '''
+    PointCloud2 -> (width * height,) structured array, cloud['x'] 처럼 field 이름으로 접근
+    row padding 이 없으면 msg.data 를 복사하지 않으므로 수정하지 말 것
+    NaN 점도 그대로 들어 있음 (비교 mask 에서는 자동으로 False)
+    '''
+    dtype = cloud_dtype(msg, field_names)
+    n = msg.width * msg.height
+    if msg.row_step == msg.width * msg.point_step:
+        return np.frombuffer(msg.data, dtype=dtype, count=n)
+
+    rows = np.frombuffer(msg.data, dtype=np.uint8).reshape(msg.height, msg.row_step)
+    return np.ascontiguousarray(rows[:, :msg.width * msg.point_step]).view(dtype).reshape(n)
+
+
+def region_mask(cloud, region):
+    ''' region 안의 점이면 True, NaN 점은 항상 False (무한대 경계는 건너뜀) '''
+    mask = np.ones(len(cloud), dtype=bool)
+    if len(region.rings) == 1:
+        mask &= cloud['ring'] == region.rings[0]
+    elif len(region.rings) > 1:
+        mask &= np.isin(cloud['ring'], region.rings)
+
+    for axis in ('x', 'y', 'z'):
+        values = cloud[axis]
+        lower, upper = getattr(region, axis)
+        if np.isfinite(lower):
+            mask &= values > lower
+        if np.isfinite(upper):
+            mask &= values < upper
+        if not (np.isfinite(lower) or np.isfinite(upper)):
+            mask &= ~np.isnan(values)
+    return mask
+
+
+def split_rings(cloud):
+    ''' ring 번호 -> 그 ring 의 점들 (원래 순서 유지), ring 별 mask 를 만들지 않고 정렬 한 번 '''
+    order = np.argsort(cloud['ring'], kind='stable')
+    rings, starts = np.unique(cloud['ring'][order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    return {int(ring): cloud[order[start:end]] for ring, start, end in zip(rings, starts, ends)}
+
+
+def cloud_stats(cloud):
+    ''' 점 개수와 높이 / 수평 거리 요약, 점이 없으면 나머지는 NaN '''
+    if len(cloud) == 0:
+        return CloudStats(0, np.nan, np.nan, np.nan, np.nan)
+    z = cloud['z']
+    return CloudStats(len(cloud), float(z.min()), float(z.mean()), float(z.max()),
+                      float(np.sqrt(cloud['x'] ** 2 + cloud['y'] ** 2).min()))
+
+
+def array_to_cloud(cloud, header):
+    ''' cloud_to_array 결과 (또는 그 일부) -> PointCloud2, field offset / point_step 은 그대로 '''
+    msg = PointCloud2()
+    msg.header = header
+    msg.height = 1
+    msg.width = len(cloud)
+    msg.is_bigendian = any(field.byteorder == '>' for field, _ in cloud.dtype.fields.values())
+    msg.point_step = cloud.dtype.itemsize
+    msg.row_step = msg.point_step * msg.width
+    msg.is_dense = False
+    msg.fields = [PointField(name=name, offset=offset, datatype=DTYPE_POINTFIELDS[field.base.str[1:]], count=1)
+                  for name, (field, offset) in cloud.dtype.fields.items()]
+
+    data = array.array('B')
+    data.frombytes(np.ascontiguousarray(cloud).tobytes())
+    msg.data = data
+    return msg
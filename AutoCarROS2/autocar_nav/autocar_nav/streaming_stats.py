@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Sliding-window statistics updated per sample instead of recomputed over
+# the whole window: majority / mode voting (Core link changes, parking_map,
+# YOLO sign and light queues), rolling variance and rolling quantiles / IQR
+# (lanenet lateral-error reliability). Results match Counter.most_common,
+# statistics.mode, np.percentile / scipy.stats.iqr and (to rounding) np.var on
+# the same window, ties included.
+
+import bisect
+from collections import deque
+
+
+class MajorityVote:
+    def __init__(self, size, fill=None):
+        '''
+        size : window 길이, fill : 처음 window 를 채울 값 (None 이면 빈 window)
+        mode() 는 최빈값, 동률이면 window 에 먼저 나온 값 (Counter.most_common, statistics.mode 와 동일)
+        '''
+        self.size = size
+        self.reset(fill)
+
+    def reset(self, fill=None):
+        self.window = deque()
+        self.positions = {} # value -> window 안에서의 위치 (append 순번), 오래된 것부터
+        self.buckets = {}   # 개수 -> 그 개수만큼 있는 값들
+        self.max_count = 0
+        self.total = 0
+        if fill is not None:
+            for _ in range(self.size):
+                self.append(fill)
+        self.updated = False # 마지막으로 내린 뒤 append 가 있었는지, 사용하는 쪽에서 내림
+
+    def __len__(self):
+        return len(self.window)
+
+    def __iter__(self):
+        return iter(self.window)
+
+    def append(self, value):
+        if len(self.window) == self.size:
+            self._remove(self.window.popleft())
+
+        self.window.append(value)
+        positions = self.positions.setdefault(value, deque())
+        positions.append(self.total)
+        self.total += 1
+        self.updated = True
+
+        count = len(positions)
+        if count > 1:
+            self._unbucket(value, count - 1)
+        self.buckets.setdefault(count, set()).add(value)
+        if count > self.max_count:
+            self.max_count = count
+
+    def _remove(self, value):
+        positions = self.positions[value]
+        positions.popleft()
+        count = len(positions)
+
+        self._unbucket(value, count + 1)
+        if count > 0:
+            self.buckets.setdefault(count, set()).add(value)
+        else:
+            del self.positions[value]
+
+        if count + 1 == self.max_count and self.max_count not in self.buckets:
+            self.max_count = count
+
+    def _unbucket(self, value, count):
+        bucket = self.buckets[count]
+        bucket.discard(value)
+        if not bucket:
+            del self.buckets[count]
+
+    def count(self, value):
+        positions = self.positions.get(value)
+        return 0 if positions is None else len(positions)
+
+    def mode(self):
+        ''' 최빈값, 빈 window 이면 None '''
+        if self.max_count == 0:
+            return None
+        tied = self.buckets[self.max_count]
+        if len(tied) == 1:
+            return next(iter(tied))
+        return min(tied, key=lambda value: self.positions[value][0])
+
+    def latest(self, skip=None):
+        ''' skip 이 아닌 가장 최근 값, 없으면 None '''
+        for value in reversed(self.window):
+            if value != skip:
+                return value
+        return None
+
+
+class RollingVariance:
+    def __init__(self, size):
+        '''
+        최근 size 개의 평균 / 분산 (np.var 와 같은 모분산), 추가 / 제거마다 Welford 갱신
+        제거 갱신의 반올림 오차가 쌓이지 않도록 size 번마다 window 로 다시 계산 (평균 O(1))
+        '''
+        self.size = size
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.window)
+
+    def append(self, value):
+        value = float(value)
+        if len(self.window) == self.size:
+            old = self.window.popleft()
+            n = len(self.window)
+            if n == 0:
+                self.mean, self.m2 = 0.0, 0.0
+            else:
+                mean = self.mean - (old - self.mean) / n
+                self.m2 -= (old - self.mean) * (old - mean)
+                self.mean = mean
+
+        self.window.append(value)
+        self.updates += 1
+        if self.updates >= self.size:
+            self.updates = 0
+            self.mean = sum(self.window) / len(self.window)
+            self.m2 = sum((x - self.mean) ** 2 for x in self.window)
+        else:
+            delta = value - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (value - self.mean)
+
+    def variance(self):
+        if not self.window:
+            return 0.0
+        return max(self.m2, 0.0) / len(self.window)
+
+
+class RollingQuantile:
+    def __init__(self, size):
+        '''
+        최근 size 개를 정렬한 채로 유지 (bisect), quantile 은 np.percentile 기본(linear) 보간
+        window 가 수십 개 수준이라 한 번 갱신이 이분 탐색 + 짧은 memmove
+        '''
+        self.size = size
+        self.window = deque()
+        self.sorted = []
+
+    def __len__(self):
+        return len(self.window)
+
+    def append(self, value):
+        if len(self.window) == self.size:
+            old = self.window.popleft()
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.window.append(value)
+        bisect.insort(self.sorted, value)
+
+    def quantile(self, q):
+        ''' q : 0 ~ 1 '''
+        if not self.sorted:
+            return 0.0
+        position = q * (len(self.sorted) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self.sorted) - 1)
+        return self.sorted[lower] + (self.sorted[upper] - self.sorted[lower]) * (position - lower)
+
+    def iqr(self):
+        return self.quantile(0.75) - self.quantile(0.25)
+
+    def is_outlier(self, value, k=1.5):
+        ''' Tukey fence : Q1 - k IQR 보다 작거나 Q3 + k IQR 보다 크면 '''
+        q1, q3 = self.quantile(0.25), self.quantile(0.75)
+        return value < q1 - k * (q3 - q1) or value > q3 + k * (q3 - q1)
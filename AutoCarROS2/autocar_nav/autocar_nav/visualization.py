@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Rate-limited publisher for RViz-only topics. The message is built lazily,
+# only when the topic has a subscriber and its rate limit allows a publish,
+# so a run without RViz pays nothing for visualization. Messages that only
+# change when their inputs change (static markers) can be cached by key.
+
+import time
+
+
+class ThrottledPublisher:
+    def __init__(self, node, msg_type, topic, rate, qos=10):
+        '''
+        rate : 최대 publish 주기 [Hz], 0 이하이면 제한 없음
+        '''
+        self.publisher = node.create_publisher(msg_type, topic, qos)
+        self.period = 1.0 / rate if rate > 0 else 0.0
+        self.last_publish = None
+
+        self.cache_key = None
+        self.cache_msg = None
+
+    def ready(self):
+        ''' 구독자가 있고 마지막 publish 후 주기가 지났으면 True '''
+        if self.publisher.get_subscription_count() == 0:
+            return False
+        if self.last_publish is not None and time.monotonic() - self.last_publish < self.period:
+            return False
+        return True
+
+    def publish(self, build, key=None):
+        '''
+        build : 메시지를 만드는 함수, 실제로 publish 할 때만 호출
+        key   : 주어지면 key 가 바뀔 때만 build 를 다시 호출하고 그 사이에는 이전 메시지를 다시 publish
+        return : publish 했으면 True
+        '''
+        if not self.ready():
+            return False
+
+        if key is None:
+            msg = build()
+        else:
+            if self.cache_msg is None or key != self.cache_key:
+                self.cache_msg = build()
+                self.cache_key = key
+            msg = self.cache_msg
+
+        self.last_publish = time.monotonic()
+        self.publisher.publish(msg)
+        return True
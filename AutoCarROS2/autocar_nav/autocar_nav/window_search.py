@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Nearest-waypoint search for several query points (front / rear axle) on a
+# path that is replaced every tick. The local planner republishes the path
+# on every state, so instead of starting over, the previous index is carried
+# to the new path through its (x, y) and only a window around it is
+# searched. The look-behind is sized in metres so the rear axle stays inside
+# the window whatever the waypoint spacing. A minimum on the window edge
+# falls back to a full scan, so results always equal the brute-force argmin.
+
+import math
+import numpy as np
+
+
+class WindowSearch:
+    def __init__(self, behind_dist, ahead=40, margin=10, rebase_range=200, rebase_dist=1.0):
+        '''
+        behind_dist  : 첫 query 점 뒤로 볼 거리 [m] (front -> rear axle 거리), ahead : 앞으로 볼 waypoint 개수
+        rebase_range : 새 path 에서 이전 index 의 점을 찾을 index 범위, rebase_dist : 이보다 멀면 전체 탐색 [m]
+        '''
+        self.behind_dist = behind_dist
+        self.ahead = ahead
+        self.margin = margin
+        self.rebase_range = rebase_range
+        self.rebase_dist = rebase_dist
+        self.behind = margin
+
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.index = None
+        self.full_scans = 0
+        self.window_scans = 0
+
+    def reset(self):
+        ''' 다음 탐색은 전체 path 에서 '''
+        self.index = None
+
+    def set_path(self, x, y, spacing):
+        ''' 새 path, spacing : 평균 waypoint 간격 [m] '''
+        if spacing > 0:
+            self.behind = int(math.ceil(self.behind_dist / spacing)) + self.margin
+
+        index = None
+        if self.index is not None and self.index < len(self.x) and len(x) > 0:
+            # 이전 index 의 점이 새 path 에서 어디인지 (보통 같은 경로가 조금 밀려서 옴)
+            px, py = self.x[self.index], self.y[self.index]
+            lo = max(self.index - self.rebase_range, 0)
+            hi = min(self.index + self.rebase_range, len(x))
+            if lo < hi:
+                d = np.hypot(x[lo:hi] - px, y[lo:hi] - py)
+                k = int(np.argmin(d))
+                if d[k] <= self.rebase_dist:
+                    index = lo + k
+
+        self.x, self.y = x, y
+        self.index = index
+
+    def nearest(self, px, py):
+        '''
+        점 (px[k], py[k]) 들 각각에서 가장 가까운 waypoint, 창은 px[0] 의 이전 index 기준
+        return : index, dx, dy (점 - waypoint)
+        '''
+        n = len(self.x)
+        px = np.asarray(px)[:, None]
+        py = np.asarray(py)[:, None]
+
+        if self.index is None:
+            lo, hi = 0, n
+        else:
+            lo = max(self.index - self.behind, 0)
+            hi = min(self.index + self.ahead, n)
+
+        while True:
+            dx = px - self.x[lo:hi]
+            dy = py - self.y[lo:hi]
+            ids = np.argmin(np.hypot(dx, dy), axis=1)
+
+            at_edge = (lo > 0 and np.any(ids == 0)) or (hi < n and np.any(ids == hi - lo - 1))
+            if not at_edge: break
+            lo, hi = 0, n
+
+        if lo == 0 and hi == n:
+            self.full_scans += 1
+        else:
+            self.window_scans += 1
+
+        rows = np.arange(len(ids))
+        self.index = lo + int(ids[0])
+        return lo + ids, dx[rows, ids], dy[rows, ids]
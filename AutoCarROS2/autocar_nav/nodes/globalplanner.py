@@ -12,11 +12,13 @@ from rclpy.callback_groups import ReentrantCallbackGroup
 from ament_index_python.packages import get_package_share_directory
 
 from std_msgs.msg import Float64MultiArray, Int32, String
-from autocar_msgs.msg import Path2D, State2D, LinkArray, Obstacle
-from geometry_msgs.msg import Pose2D
+from autocar_msgs.msg import CompactPath2D, State2D, LinkArray, Obstacle
 
 from autocar_nav.calculate_offset import point_offset, line_offset
-from autocar_nav.calculate_curvature import classify_segments
+from autocar_nav.path_msg import path_to_msg, msg_to_arrays
+from autocar_nav.path_index import PathIndex
+from autocar_nav.change_publisher import ChangePublisher
+from autocar_nav.calculate_curvature import DirectionProfile
 
 path_module = os.path.join(get_package_share_directory('autocar_map'), 'path')
 sys.path.append(path_module)
@@ -31,18 +33,16 @@ class GlobalPathPlanner(Node):
         super().__init__('global_planner')
 
         # Initialise publisher(s)
-        self.goals_pub = self.create_publisher(Path2D, '/autocar/goals', 10)
-        self.lanes_pub = self.create_publisher(Path2D, '/autocar/tunnel_lane', 10)
-        self.links_pub = self.create_publisher(LinkArray, '/autocar/mode', 10)
-        self.mode_pub = self.create_publisher(String, '/yolo_mode', 10)
+        self.goals_pub = self.create_publisher(CompactPath2D, '/autocar/goals', 10)
+        self.lanes_pub = self.create_publisher(CompactPath2D, '/autocar/tunnel_lane', 10)
         # self.offset_pub = self.create_publisher(Float64MultiArray, '/autocar/tunnel_offset', 10)
 
         # Initialise suscriber(s)
         self.localization_sub = self.create_subscription(State2D, '/autocar/state2D', self.vehicle_state_cb, 10, callback_group=ReentrantCallbackGroup())
         self.parking_path_sub = self.create_subscription(Int32, '/autocar/parking_path', self.parking_path_cb, 10)
         self.mission_status_sub = self.create_subscription(String,'/autocar/mission_status', self.mission_status_cb, 10)
-        self.walls_sub = self.create_subscription(Path2D, '/wall_path', self.walls_cb, 10)
-        self.lanes_sub = self.create_subscription(Path2D, '/wall_lane', self.lanes_cb, 10)
+        self.walls_sub = self.create_subscription(CompactPath2D, '/wall_path', self.walls_cb, 10)
+        self.lanes_sub = self.create_subscription(CompactPath2D, '/wall_lane', self.lanes_cb, 10)
         self.obstacle_sub = self.create_subscription(Obstacle, '/autocar/obs_recog', self.obstacle_cb, 10)
 
         # Load parameters
@@ -67,6 +67,16 @@ class GlobalPathPlanner(Node):
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
+        # yolo_mode 를 값이 바뀔 때만 publish 할지 (heartbeat 주기로는 계속 publish)
+        self.publish_on_change = bool(self.declare_parameter('publish_on_change', False).value)
+        self.heartbeat_frequency = float(self.declare_parameter('heartbeat_frequency', 1.0).value)
+        self.log_period = float(self.declare_parameter('log_period', 1.0).value) # 매 tick 로그 최소 간격 [s]
+
+        # LinkArray 는 closest_wp / traffic_stop_wp 가 거의 매 tick 바뀌고 Core, localplanner 가 매 tick 값과
+        # Core 의 link 다수결이 메시지 개수에 기대므로 on-change 로 줄이지 않고 항상 매 tick publish
+        self.links_pub = ChangePublisher(self, LinkArray, '/autocar/mode', self.heartbeat_frequency, on_change=False)
+        self.mode_pub = ChangePublisher(self, String, '/yolo_mode', self.heartbeat_frequency, self.publish_on_change)
+
         # Class variables to use whenever within the class when necessary
         self.x = None
         self.y = None
@@ -75,6 +85,7 @@ class GlobalPathPlanner(Node):
         # Import waypoints.csv into class variables ax and ay
         self.mx = use_map.ax
         self.my = use_map.ay
+        self.path_index = {} # link 별 PathIndex, 처음 사용할 때 생성
 
         self.global_index = start_index
         self.link = 'global_' + str(self.global_index)
@@ -84,6 +95,7 @@ class GlobalPathPlanner(Node):
         self.status = 'driving'
         self.direction = 'Straight'
         self.curv_thresh = 0.01
+        self.direction_profile = {} # link 별 DirectionProfile, 처음 사용할 때 생성
 
         self.next_path = use_map.next_path
 
@@ -136,22 +148,10 @@ class GlobalPathPlanner(Node):
         self.status = msg.data
 
     def walls_cb(self, msg):
-        self.tx = []
-        self.ty = []
-        for i in range(len(msg.poses)):
-            wx = msg.poses[i].x
-            wy = msg.poses[i].y
-            self.tx.append(wx)
-            self.ty.append(wy)
+        self.tx, self.ty, _ = msg_to_arrays(msg)
 
     def lanes_cb(self, msg):
-        self.lx = []
-        self.ly = []
-        for i in range(len(msg.poses)):
-            wx = msg.poses[i].x
-            wy = msg.poses[i].y
-            self.lx.append(wx)
-            self.ly.append(wy)
+        self.lx, self.ly, _ = msg_to_arrays(msg)
 
     def vehicle_state_cb(self, msg):
         '''
@@ -188,11 +188,8 @@ class GlobalPathPlanner(Node):
         wp_ahead = 10
         wp_behind = 5
 
-        dx = [fx - icx for icx in via_x] # Find the x-axis of the front axle relative to the path_num
-        dy = [fy - icy for icy in via_y] # Find the y-axis of the front axle relative to the path_num
-
-        d = np.hypot(dx, dy)        # Find the distance from the front axle to the path_num
-        closest_id = int(np.argmin(d))   # Returns the index with the shortest distance in the array
+        # 이전 waypoint 주변에서만 가장 가까운 waypoint 탐색
+        closest_id = self.get_path_index(self.link).nearest(fx, fy)
 
         transform = self.frame_transform(via_x[closest_id], via_y[closest_id], fx, fy, self.theta)
 
@@ -208,6 +205,7 @@ class GlobalPathPlanner(Node):
                 self.global_index += 1
                 closest_id = wp_behind
                 self.traffic_stop_wp = 1e3
+                self.get_path_index('global_' + str(self.global_index)).reset(closest_id)
 
 
         self.mode = self.mode_list[self.global_index]
@@ -216,6 +214,16 @@ class GlobalPathPlanner(Node):
         return closest_id, transform
 
 
+    def get_path_index(self, link):
+        if link not in self.path_index:
+            self.path_index[link] = PathIndex(self.mx[link], self.my[link])
+        return self.path_index[link]
+
+    def get_direction_profile(self, link):
+        if link not in self.direction_profile:
+            self.direction_profile[link] = DirectionProfile(self.mx[link], self.my[link], self.curv_thresh)
+        return self.direction_profile[link]
+
     def get_parking_stop_wp(self, px, py):
         # Identify position of vehicle front axle
         fx = self.x + self.FL * np.cos(self.theta)
@@ -244,7 +252,7 @@ class GlobalPathPlanner(Node):
 
         if self.mode == 'parking' and self.parking_path_num != -1:
             # 주차 맵 첫 부분과 현재 글로벌 맵의 첫 부분을 잇는 path를 다시 형성
-            self.get_logger().info('Parking path number : {} '.format(self.parking_path_num))
+            self.get_logger().info('Parking path number : {} '.format(self.parking_path_num), throttle_duration_sec=self.log_period)
 
             self.link = self.mode + '_' + str(self.parking_path_num)
 
@@ -270,7 +278,7 @@ class GlobalPathPlanner(Node):
             self.direction = 'Straight'
 
         elif self.mode == 'revpark' and self.parking_path_num != -1 and self.status != 'driving':
-            self.get_logger().info('Parking path number : {} '.format(self.parking_path_num))
+            self.get_logger().info('Parking path number : {} '.format(self.parking_path_num), throttle_duration_sec=self.log_period)
 
             self.link = self.mode + '_' + str(self.parking_path_num)
             park_x = self.mx[self.link]
@@ -315,29 +323,29 @@ class GlobalPathPlanner(Node):
             self.wp_num = len(self.mx[self.link])
             percent = int( 100 * closest_id / self.wp_num)
 
-            self.get_logger().info('Link : {} ( {} % )'.format(self.link, percent))
+            self.get_logger().info('Link : {} ( {} % )'.format(self.link, percent), throttle_duration_sec=self.log_period)
 
             if closest_id < self.wp_behind:
                 # If the vehicle is starting along the path_num
-                px = self.mx[self.link][0: self.wp_published]
-                py = self.my[self.link][0: self.wp_published]
+                start, stop = 0, self.wp_published
 
             elif closest_id > (self.wp_num - self.wp_published):
                 # If the vehicle is finishing the given set of waypoints
-                px = self.mx[self.link][-self.wp_published:]
-                py = self.my[self.link][-self.wp_published:]
+                start, stop = max(self.wp_num - self.wp_published, 0), self.wp_num
 
             elif transform[1] < (0.0 - self.passed_threshold):
                 # If the vehicle has passed, closest point is preserved as a point behind the car
-                px = self.mx[self.link][closest_id - (self.wp_behind - 1) : closest_id + (self.wp_ahead + 1)]
-                py = self.my[self.link][closest_id - (self.wp_behind - 1) : closest_id + (self.wp_ahead + 1)]
+                start, stop = closest_id - (self.wp_behind - 1), closest_id + (self.wp_ahead + 1)
 
             else:
                 # If the vehicle has yet to pass, a point behind the closest is preserved as a point behind the car
-                px = self.mx[self.link][(closest_id - self.wp_behind) : (closest_id + self.wp_ahead)]
-                py = self.my[self.link][(closest_id - self.wp_behind) : (closest_id + self.wp_ahead)]
+                start, stop = closest_id - self.wp_behind, closest_id + self.wp_ahead
 
-            self.direction = classify_segments(px[self.wp_behind:], py[self.wp_behind:], self.curv_thresh)
+            px = self.mx[self.link][start : stop]
+            py = self.my[self.link][start : stop]
+
+            # 미리 계산한 곡률 profile 에서 차량 앞 waypoint 들의 Straight / Curve
+            self.direction = self.get_direction_profile(self.link).direction(start + self.wp_behind, stop)
 
             self.parking_stop_wp = 1e3
 
@@ -406,16 +414,7 @@ class GlobalPathPlanner(Node):
 
         waypoints = min(len(lx), len(ly))
 
-        lanes = Path2D()
-
-        for i in range(waypoints):
-            # Appending to Target Goals
-            lane = Pose2D()
-            lane.x = lx[i]
-            lane.y = ly[i]
-            lane.theta = lyaw
-
-            lanes.poses.append(lane)
+        lanes = path_to_msg(lx[:waypoints], ly[:waypoints], np.full(waypoints, lyaw))
 
         if waypoints != 0: self.lanes_pub.publish(lanes)
 
@@ -423,15 +422,7 @@ class GlobalPathPlanner(Node):
 
         waypoints = min(len(px), len(py))
 
-        goals = Path2D()
-
-        for i in range(waypoints):
-            # Appending to Target Goals
-            goal = Pose2D()
-            goal.x = px[i]
-            goal.y = py[i]
-
-            goals.poses.append(goal)
+        goals = path_to_msg(px[:waypoints], py[:waypoints])
 
         if waypoints != 0: self.goals_pub.publish(goals)
 
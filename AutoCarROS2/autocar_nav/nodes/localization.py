@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os
-import time
 import math
 import numpy as np
 import pandas as pd
@@ -16,16 +15,20 @@ from sklearn.linear_model import RANSACRegressor
 
 from std_msgs.msg import Float64MultiArray, Float32MultiArray, Float32, Float64, String
 from nav_msgs.msg import Path, Odometry
-from autocar_msgs.msg import State2D, LinkArray, Path2D
+from autocar_msgs.msg import State2D, LinkArray, CompactPath2D
 from geometry_msgs.msg import PoseStamped, TransformStamped, Point32
 from rcl_interfaces.msg import SetParametersResult
 
 from sensor_msgs.msg import PointCloud2, PointCloud, ChannelFloat32
-from sensor_msgs_py import point_cloud2
 
 
 from autocar_nav.quaternion import yaw_to_quaternion
 from autocar_nav.normalise_angle import normalise_angle
+from autocar_nav.path_msg import msg_to_arrays
+from autocar_nav.path_index import PathIndex
+from autocar_nav.node_clock import NodeClock
+from autocar_nav.point_cloud import cloud_to_array, region_mask, TUNNEL_CEILING
+from autocar_nav.visualization import ThrottledPublisher
 
 
 class Localization(Node):
@@ -36,7 +39,7 @@ class Localization(Node):
 
         # Initialise publishers
         self.localization_pub = self.create_publisher(State2D, '/autocar/state2D', 10)
-        self.trajectory_pub = self.create_publisher(Path, '/rviz/trajectory', 10)
+        self.trajectory_pub = ThrottledPublisher(self, Path, '/rviz/trajectory', rate=2.0)
         self.offset_pub = self.create_publisher(Float64MultiArray, '/autocar/dr_offset', 10)
         self.state_pub = self.create_publisher(String, '/autocar/odom_state', 10)
         self.tunnel_yaw_pub = self.create_publisher(Float32, '/autocar/tunnel_yaw', 10)
@@ -48,7 +51,7 @@ class Localization(Node):
         self.mode_sub = self.create_subscription(LinkArray, '/autocar/mode', self.mode_cb, 10)
         self.pose_offset_sub= self.create_subscription(Float32MultiArray , '/data/key_offset', self.pose_offset_cb, 10)
 
-        self.goals_sub = self.create_subscription(Path2D, '/autocar/goals', self.goals_cb, 10)
+        self.goals_sub = self.create_subscription(CompactPath2D, '/autocar/goals', self.goals_cb, 10)
         self.lateral_error_sub = self.create_subscription(Float32, '/lanenet/lateral_error', self.lateral_error_cb, 10)
 
         self.he_error_sub = self.create_subscription(Float64, '/autocar/he_error', self.he_error_cb, 10)
@@ -62,12 +65,14 @@ class Localization(Node):
                 namespace='',
                 parameters=[
                     ('update_frequency', 10.0),
-                    ('centreofgravity_to_frontaxle', 1.04/2)
+                    ('centreofgravity_to_frontaxle', 1.04/2),
+                    ('publish_upper_points', False)
                 ]
             )
 
             self.frequency = float(self.get_parameter("update_frequency").value)
             self.cg2frontaxle = float(self.get_parameter("centreofgravity_to_frontaxle").value)
+            self.publish_upper_points = bool(self.get_parameter("publish_upper_points").value)
 
         except:
             raise Exception("Missing ROS parameters. Check the configuration file.")
@@ -76,6 +81,7 @@ class Localization(Node):
         df = pd.read_csv(file_path + '/kcity/tunnel_map.csv')
         self.tunnel_x = df['X'].tolist()
         self.tunnel_y = df['Y'].tolist()
+        self.tunnel_index = PathIndex(self.tunnel_x, self.tunnel_y)
 
         # Class constants
         self.state2d = None
@@ -95,6 +101,8 @@ class Localization(Node):
         self.dx_key_offset = 0.0
         self.dy_key_offset = 0.0
 
+        # (x, y, 받은 시각), 시각은 node clock 기준이라 bag 배속 재생에서도 gp / dp 짝이 맞음
+        self.clock = NodeClock(self)
         self.gp = []
         self.dp = []
         self.min_offset_list = []
@@ -169,44 +177,25 @@ class Localization(Node):
 
         
     def lidar_callback(self, msg):
-        # Read the point cloud data
-        self.pointcloud.header.stamp = self.get_clock().now().to_msg()
-        pc_data = list(point_cloud2.read_points(msg, field_names=("x", "y", "z", "intensity", "ring"), skip_nans=True))
-        filtered_list = [tup for tup in pc_data if tup[-1] == 15]
-        xyz_data = [(point[0], point[1], point[2],  point[3]) for point in filtered_list]
-        #print('filtered_list',filtered_list)
-        intensity = []
-        self.pointcloud.points.clear()
-        min_z = 100.0
-        for x, y, z, int in xyz_data:
-            point = Point32()
-            point.x = x
-            point.y = y
-            point.z = z
-            if z > 2 and x < 10 and x > 0 and y < 0 :
-                intensity.append(int)       
-                self.pointcloud.points.append(point)
-                print('z', z)
-                if z < min_z:
-                    min_z = z
-
-        if len(self.pointcloud.points) < 3 and self.tunnel_exit:
+        # ring 15 중 차량 오른쪽 위 (터널 천장) 에 닿은 점 수로 터널 출구 판단
+        cloud = cloud_to_array(msg, ('x', 'y', 'z', 'intensity', 'ring'))
+        upper = region_mask(cloud, TUNNEL_CEILING)
+        count = int(np.count_nonzero(upper))
 
+        if count < 3 and self.tunnel_exit:
             self.tunnel_exit_lidar = True
         else:
             self.tunnel_exit_lidar = False
-        
-        print(len(self.pointcloud.points))
-        print('mode',self.tunnel_exit_lidar)
-        
-        # self.get_logger().info('tunnel_exit  : %s' %self.tunnel_exit_lidar)
-        
-        
- 
-        self.channel.values = intensity
 
-        self.publisher.publish(self.pointcloud)
-        
+        self.get_logger().debug('upper points : %d, tunnel_exit_lidar : %s' % (count, self.tunnel_exit_lidar))
+
+        if self.publish_upper_points:
+            self.pointcloud.header.stamp = msg.header.stamp
+            points = cloud[upper]
+            self.pointcloud.points = [Point32(x=px, y=py, z=pz) for px, py, pz in zip(points['x'].tolist(), points['y'].tolist(), points['z'].tolist())]
+            self.channel.values = points['intensity'].tolist()
+            self.publisher.publish(self.pointcloud)
+
 
     def mission_status_cb(self, msg):
 
@@ -233,13 +222,7 @@ class Localization(Node):
         return SetParametersResult(successful=True)
 
     def goals_cb(self, msg):
-        self.ax = []
-        self.ay = []
-        for i in range(len(msg.poses)):
-            px = msg.poses[i].x
-            py = msg.poses[i].y
-            self.ax.append(px)
-            self.ay.append(py)
+        self.ax, self.ay, _ = msg_to_arrays(msg)
         path_yaw = self.get_path_yaw(self.ax, self.ay)
         if abs(self.state2d.pose.theta - path_yaw) < math.pi:
             self.path_yaw = path_yaw
@@ -272,7 +255,7 @@ class Localization(Node):
     def vehicle_state_cb(self, msg):
         zz = 3
         self.state = msg
-        self.gp.append((msg.pose.pose.position.x,msg.pose.pose.position.y,time.time()))
+        self.gp.append((msg.pose.pose.position.x,msg.pose.pose.position.y,self.clock.now()))
 
         if len(self.gp) > 100:
             del self.gp[0]
@@ -311,7 +294,7 @@ class Localization(Node):
         #     self.odom_state = 'GPS-Odometry'
 
 
-        self.dp.append((msg.pose.pose.position.x,msg.pose.pose.position.y,time.time()))
+        self.dp.append((msg.pose.pose.position.x,msg.pose.pose.position.y,self.clock.now()))
         if len(self.dp) > 100:
             del self.dp[0]
         #rtcm msg > rtcm callback에서
@@ -407,15 +390,7 @@ class Localization(Node):
                 break
 
     def get_lateral_error(self, x, y):
-        wp_num = len(self.tunnel_x)
-
-        dx = [x - icx for icx in self.tunnel_x]
-        dy = [y - icy for icy in self.tunnel_y]
-
-        d = np.hypot(dx, dy)
-        closest_id = int(np.argmin(d))
-
-        return closest_id
+        return self.tunnel_index.nearest(x, y)
 
 
     def mode_cb(self, msg):
@@ -436,6 +411,7 @@ class Localization(Node):
     def update_state(self, state):
         # Define vehicle pose x,y, theta
         self.state2d = State2D()
+        self.state2d.header = state.header # odometry 측정 시각, tracker 의 지연 보상에 사용
         self.state2d.pose.x = state.pose.pose.position.x
         self.state2d.pose.y = state.pose.pose.position.y
         self.state2d.pose.theta = 2.0 * np.arctan2(state.pose.pose.orientation.z, state.pose.pose.orientation.w)
@@ -472,25 +448,26 @@ class Localization(Node):
             self.tw.append(self.state2d.pose.theta)
 
             if len(self.tx) > 2:
-                # Path 메시지 구성
-                path = Path()
-                path.header.frame_id = "odom"
-                path.header.stamp = self.get_clock().now().to_msg()
-
-                path_length = min(len(self.tx), len(self.ty), len(self.tw))
-
-                for n in range(path_length):
-                    # Appending to Visualization Path
-                    vpose = PoseStamped()
-                    vpose.header.frame_id = "odom"
-                    vpose.header.stamp = self.get_clock().now().to_msg()
-                    vpose.pose.position.x = self.tx[n]
-                    vpose.pose.position.y = self.ty[n]
-                    vpose.pose.position.z = 0.0
-                    vpose.pose.orientation = yaw_to_quaternion(self.tw[n] - np.pi * 0.5)
-                    path.poses.append(vpose)
-
-                self.trajectory_pub.publish(path)
+                self.trajectory_pub.publish(self.make_trajectory)
+
+    def make_trajectory(self):
+        # Path 메시지 구성
+        path = Path()
+        path.header.frame_id = "odom"
+        path.header.stamp = self.get_clock().now().to_msg()
+
+        for x, y, yaw in zip(self.tx, self.ty, self.tw):
+            # Appending to Visualization Path
+            vpose = PoseStamped()
+            vpose.header.frame_id = "odom"
+            vpose.header.stamp = path.header.stamp
+            vpose.pose.position.x = x
+            vpose.pose.position.y = y
+            vpose.pose.position.z = 0.0
+            vpose.pose.orientation = yaw_to_quaternion(yaw - np.pi * 0.5)
+            path.poses.append(vpose)
+
+        return path
 
     def get_path_yaw(self, ax ,ay):
 
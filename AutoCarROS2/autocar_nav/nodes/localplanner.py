@@ -2,25 +2,28 @@
 
 import os
 import time
+import threading
 import numpy as np
 import pandas as pd
 from scipy.interpolate import CubicSpline
 
 import rclpy
 from rclpy.node import Node
-from rclpy.duration import Duration
 from rclpy.callback_groups import ReentrantCallbackGroup
 from ament_index_python.packages import get_package_share_directory
 
 from nav_msgs.msg import Path
-from std_msgs.msg import Float64MultiArray, String
-from autocar_msgs.msg import Path2D, State2D, ObjectArray, LinkArray, Obstacle
-from geometry_msgs.msg import Pose2D, PoseStamped
+from std_msgs.msg import Float64, Float64MultiArray, String
+from autocar_msgs.msg import CompactPath2D, State2D, ObjectArray, LinkArray, Obstacle
+from geometry_msgs.msg import PoseStamped
 from visualization_msgs.msg import Marker, MarkerArray
 
 from autocar_nav.quaternion import yaw_to_quaternion
 from autocar_nav.hybrid_a_star import hybrid_a_star
-from autocar_nav.separation_axis_theorem import separating_axis_theorem, get_vertice_rect
+from autocar_nav.heuristic import NonHolonomicHeuristic
+from autocar_nav.obstacle_index import ObstacleIndex
+from autocar_nav.path_msg import path_to_msg, msg_to_arrays
+from autocar_nav.visualization import ThrottledPublisher
 
 
 class LocalPathPlanner(Node):
@@ -29,14 +32,15 @@ class LocalPathPlanner(Node):
         super().__init__('local_planner')
 
         # Initialise publishers
-        self.local_planner_pub = self.create_publisher(Path2D, '/autocar/path', 10)
-        self.path_viz_pub = self.create_publisher(Path, '/autocar/viz_path', 10)
+        self.local_planner_pub = self.create_publisher(CompactPath2D, '/autocar/path', 10)
+        self.path_viz_pub = ThrottledPublisher(self, Path, '/autocar/viz_path', rate=5.0)
         self.obs_recog_pub = self.create_publisher(Obstacle, '/autocar/obs_recog', 10)
-        self.center_viz_pub = self.create_publisher(MarkerArray, '/rviz/pathlane', 10)
+        self.center_viz_pub = ThrottledPublisher(self, MarkerArray, '/rviz/pathlane', rate=1.0)
+        self.reroute_latency_pub = self.create_publisher(Float64, '/autocar/reroute_latency', 10)
 
         # Initialise subscribers
-        self.goals_sub = self.create_subscription(Path2D, '/autocar/goals', self.goals_cb, 10)
-        self.lanes_sub = self.create_subscription(Path2D, '/autocar/tunnel_lane', self.lanes_cb, 10)
+        self.goals_sub = self.create_subscription(CompactPath2D, '/autocar/goals', self.goals_cb, 10)
+        self.lanes_sub = self.create_subscription(CompactPath2D, '/autocar/tunnel_lane', self.lanes_cb, 10)
         self.localisation_sub = self.create_subscription(State2D, '/autocar/state2D', self.vehicle_state_cb, 10, callback_group=ReentrantCallbackGroup())
         self.obstacle_sub = self.create_subscription(ObjectArray, '/obstacles', self.obstacle_cb, 10)
         self.mode_sub = self.create_subscription(LinkArray, '/autocar/mode', self.mode_cb, 10)
@@ -76,15 +80,24 @@ class LocalPathPlanner(Node):
         self.center_x = list(np.concatenate(self.center_x))
         self.center_y = list(np.concatenate(self.center_y))
         self.center_yaw = list(np.concatenate(self.center_yaw))
+        self.center_version = 0 # center_x, center_y, center_yaw 가 바뀔 때마다 증가 (marker cache key)
         ###############################################################################
+
+        # hybrid A* 용 non-holonomic heuristic table (heuristic.py 로 생성)
+        heuristic_file = os.path.join(get_package_share_directory('autocar_nav'), 'config', 'dubins_heuristic.npz')
+        self.heuristic_table = NonHolonomicHeuristic.load(heuristic_file) if os.path.exists(heuristic_file) else None
+
         self.ds = 1 / self.frequency
 
         self.ax = []
         self.ay = []
+        self.goals_key = None # goals 내용의 hash
+        self.goal_path = None # goals 를 spline 으로 보간한 (cx, cy, cyaw)
         self.obstacles = []
+        self.obstacle_index = ObstacleIndex([]) # self.obstacles
+        self.reroute_index = ObstacleIndex([]) # self.obstacles + self.path_lane
 
-        self.target_path = Path2D()
-        self.viz_path = Path()
+        self.target_path = CompactPath2D()
 
         self.x = 0.0
         self.y = 0.0
@@ -107,8 +120,24 @@ class LocalPathPlanner(Node):
         self.dist_thresh = 6 # 정적 및 동적 판단 기준 : 6m
         self.queue = 0
         self.prev_dist = None
-        self.is_fail = False
         self.path_lane = []
+        self.last_clear_path = None # 마지막으로 충돌 검사를 통과한 (cx, cy, cyaw)
+        self.stop_margin = 30 # 충돌 지점 이만큼 앞에서 경로를 자름 (0.1 waypoint 단위)
+        self.fallback_pos_tol = 2.0 # m, last_clear_path 시작점이 차량 / 현재 경로 시작점과 이 안일 때만 재사용
+
+        # 이전 회피경로 재사용 : 출발/도착점이 허용오차 안이고 경로가 아직 충돌하지 않으면 그대로 사용
+        self.reroute_cache = None
+        self.reroute_pos_tol = 0.7 # m
+        self.reroute_yaw_tol = 10.0 # deg
+
+        # hybrid A* 는 별도 thread 에서 실행, 결과는 reroute_cache 로 넘겨받음
+        # reroute_request : 아직 시작하지 않은 가장 최근 요청, reroute_running : 탐색 중인 요청
+        self.reroute_lock = threading.Lock()
+        self.reroute_event = threading.Event()
+        self.reroute_request = None
+        self.reroute_running = None
+        self.reroute_thread = threading.Thread(target=self.reroute_worker, daemon=True)
+        self.reroute_thread.start()
 
 
     def make_lane(self, x, y, l, r):
@@ -142,26 +171,32 @@ class LocalPathPlanner(Node):
         self.center_yaw.append(yaw)
 
     def goals_cb(self, msg):
-        self.ax = []
-        self.ay = []
-        for i in range(len(msg.poses)):
-            px = msg.poses[i].x
-            py = msg.poses[i].y
-            self.ax.append(px)
-            self.ay.append(py)
+        self.ax, self.ay, _ = msg_to_arrays(msg)
+
+        # goals 가 바뀌었을 때만 spline 을 다시 계산
+        goals_key = hash((self.ax.tobytes(), self.ay.tobytes()))
+        if goals_key == self.goals_key:
+            return
+        self.goals_key = goals_key
+        self.last_clear_path = None # 다른 구간의 경로를 다시 보내지 않도록
+
+        if len(self.ax) < 2:
+            self.goal_path = None
+            return
+        cx_ = CubicSpline(range(len(self.ax)), self.ax)
+        cy_ = CubicSpline(range(len(self.ay)), self.ay)
+        dx = cx_(np.arange(0, len(self.ax) - 1, 0.1))
+        dy = cy_(np.arange(0, len(self.ay) - 1, 0.1))
+        cyaw = np.arctan2(dy[1:] - dy[:-1], dx[1:] - dx[:-1])
+        self.goal_path = (dx[:-1], dy[:-1], cyaw)
 
     def lanes_cb(self, msg):
         if self.mode == 'tunnel':
-            self.center_x = []
-            self.center_y = []
-            self.center_yaw = []
-            for i in range(len(msg.poses)):
-                px = msg.poses[i].x
-                py = msg.poses[i].y
-                pyaw = msg.poses[i].theta
-                self.center_x.append(px)
-                self.center_y.append(py)
-                self.center_yaw.append(pyaw)
+            x, y, yaw = msg_to_arrays(msg)
+            self.center_x = x.tolist()
+            self.center_y = y.tolist()
+            self.center_yaw = yaw.tolist()
+            self.center_version += 1
 
     def vehicle_state_cb(self, msg):
         self.x = msg.pose.x
@@ -171,6 +206,8 @@ class LocalPathPlanner(Node):
 
     def mode_cb(self, msg):
         self.waypoint = msg.closest_wp
+        if msg.mode != self.mode:
+            self.last_clear_path = None
         self.mode = msg.mode
         self.traffic_stop_wp = msg.traffic_stop_wp
         self.parking_stop_wp = msg.parking_stop_wp
@@ -189,16 +226,25 @@ class LocalPathPlanner(Node):
                 # length는 waypoint 간격만큼, width는 차선의 폭 (가능하면 최대한 작게)
                 self.path_lane.append((self.center_x[i], self.center_y[i], self.center_yaw[i], self.p_L, self.p_W))
 
-        self.viz_path_lane()
+        # 충돌 검사에서 근처 장애물만 찾도록 메시지마다 한 번 index 생성
+        self.obstacle_index = ObstacleIndex(self.obstacles)
+        self.reroute_index = ObstacleIndex(self.obstacles + self.path_lane)
 
+        self.center_viz_pub.publish(self.viz_path_lane, key=self.center_version)
 
-    def viz_path_lane(self):
 
+    def viz_path_lane(self):
+        # 차선이 바뀔 때만 다시 만들어지므로 lifetime 없이 두고, 이전 marker 는 DELETEALL 로 지움
         marray = MarkerArray()
+        clear = Marker()
+        clear.action = Marker.DELETEALL
+        marray.markers.append(clear)
+
+        stamp = self.get_clock().now().to_msg()
         for i in range(len(self.center_x)):
             m = Marker()
             m.header.frame_id = "/map"
-            m.header.stamp = self.get_clock().now().to_msg()
+            m.header.stamp = stamp
             m.type = m.CUBE
             m.id = i
 
@@ -220,40 +266,26 @@ class LocalPathPlanner(Node):
             m.color.b = 102 / 255.0
             m.color.a = 0.97
 
-            m.lifetime = Duration(nanoseconds=100000000).to_msg()
             marray.markers.append(m)
 
-        self.center_viz_pub.publish(marray)
+        return marray
 
     def determine_path(self, cx, cy, cyaw):
         self.obstacle_detected = False
         self.obstacle_info = 'None'
 
-        obstacle_colliding = []
         # car_msg = []
         # for i in range(0,len(cyaw),10):
         #     car_msg.append((cx[i],cy[i],cyaw[i],self.L,self.W))
 
-        for obs in self.obstacles:
-            if self.mode == 'uturn':
-                obs = (obs[0], obs[1], obs[2], 0.4, 0.4)
-
-            for i in range(0,len(cyaw),10):
-                if self.mode == 'uturn':
-                    car_vertices = get_vertice_rect((cx[i],cy[i],cyaw[i], 1.6, 1.))
-                elif self.mode == 'static1':
-                    car_vertices = get_vertice_rect((cx[i],cy[i],cyaw[i], 1.6, 2.8))
-                elif self.mode == 'static0':
-                    car_vertices = get_vertice_rect((cx[i],cy[i],cyaw[i], 1.6, 2.5))
-                else:
-                    car_vertices = get_vertice_rect((cx[i],cy[i],cyaw[i], 1.6, 2.2))
-
-                obstacle_vertices = get_vertice_rect(obs)
-                is_collide = separating_axis_theorem(car_vertices, obstacle_vertices)
+        obstacles = self.obstacles
+        if self.mode == 'uturn':
+            obstacles = [(obs[0], obs[1], obs[2], 0.4, 0.4) for obs in obstacles]
 
-                if is_collide:
-                    obstacle_colliding.append(obs)
-                    break
+        # 경로 위 어느 한 점과라도 겹치는 장애물
+        matrix = self.path_collision_matrix(cx, cy, cyaw, obstacles)
+        collide = matrix.any(axis=0)
+        obstacle_colliding = [obs for obs, is_collide in zip(obstacles, collide) if is_collide]
 
         # 모드에 따라 reroute할것인지 급정거 할 것인지 설정
         if len(obstacle_colliding) != 0:
@@ -262,7 +294,8 @@ class LocalPathPlanner(Node):
             self.obstacle_dist = np.sqrt((self.x - o[0])**2 + (self.y - o[1])**2)
             self.obstacle_detected = True
             if self.mode in ['static0', 'static1', 'tunnel']:
-                cx, cy, cyaw = self.collision_reroute(cx, cy, cyaw, obstacle_colliding)
+                first_hit = int(np.argmax(matrix.any(axis=1))) * 10
+                cx, cy, cyaw = self.collision_reroute(cx, cy, cyaw, obstacle_colliding, first_hit)
 
             # elif self.mode == 'dynamic':
             #     self.obstacle_dist = np.sqrt((self.x - o[0])**2 + (self.y - o[1])**2)
@@ -277,10 +310,39 @@ class LocalPathPlanner(Node):
                 self.queue = 5
                 self.prev_dist = None
                 self.obstacle_dist = 1e3
+            self.last_clear_path = (cx, cy, cyaw)
 
         return cx, cy, cyaw
 
-    def collision_reroute(self, cx, cy, cyaw, obstacle_colliding):
+    def path_collision_matrix(self, cx, cy, cyaw, obstacles):
+        ''' 경로를 10 점마다 차량 box 로 보고 obstacles 와의 충돌 여부, (경로 점, 장애물) bool 행렬 '''
+        if self.mode == 'uturn': car_W = 1.
+        elif self.mode == 'static1': car_W = 2.8
+        elif self.mode == 'static0': car_W = 2.5
+        else: car_W = 2.2
+
+        n = len(cyaw[::10])
+        cars = np.column_stack((cx[:len(cyaw):10], cy[:len(cyaw):10], cyaw[::10], np.full(n, 1.6), np.full(n, car_W)))
+        return self.obstacle_index.collision_matrix(cars, boxes=obstacles)
+
+    def fallback_path(self, cx, cy, cyaw, first_hit):
+        '''
+        회피경로 탐색이 끝나기 전에 보낼 경로
+        마지막으로 충돌 검사를 통과한 경로가 같은 자리에서 시작하고 지금도 비어 있으면 그 경로,
+        아니면 충돌 지점 앞에서 자른 경로 + 정지 요청
+        '''
+        if self.last_clear_path is not None:
+            lx, ly, _ = self.last_clear_path
+            near = np.hypot(lx[0] - self.x, ly[0] - self.y) <= self.fallback_pos_tol or \
+                   np.hypot(lx[0] - cx[0], ly[0] - cy[0]) <= self.fallback_pos_tol
+            if near and not self.path_collision_matrix(*self.last_clear_path, self.obstacles).any():
+                return self.last_clear_path
+
+        self.obstacle_info = 'dynamic' # Core 는 dynamic 이면 정지 후 대기
+        end = max(first_hit - self.stop_margin, 2)
+        return cx[:end], cy[:end], cyaw[:end]
+
+    def collision_reroute(self, cx, cy, cyaw, obstacle_colliding, first_hit):
         if self.mode == 'static1': step = 90
         elif self.mode =='static0': step = 70
         else: step = 70
@@ -340,17 +402,16 @@ class LocalPathPlanner(Node):
         elif self.mode == 'static0' : self.W = 2.05
         else: self.W = 1.9
 
-        hy_a_star = hybrid_a_star(region1_x, region2_x,
-                                  region1_y, region2_y,
-                                  obstacle = obstacles,
-                                  resolution = 1.0,
-                                  length = self.L, width = self.W)
-        reroute_path = hy_a_star.find_path(start, end, max_steer = 27)
+        reroute_path, hit = self.reuse_reroute(start, end, self.reroute_index)
+        if reroute_path is None or hit is not None:
+            # 충돌 직전까지는 유지하고 그 뒤만 다시 탐색
+            prefix = reroute_path[:hit - 2] if reroute_path is not None and hit >= 3 else []
+            self.request_reroute({'mode': self.mode, 'W': self.W, 'start': start, 'end': end, 'prefix': prefix,
+                                  'region': (region1_x, region2_x, region1_y, region2_y),
+                                  'obstacles': obstacles, 'obstacle_index': self.reroute_index})
 
-        if reroute_path is None:
-          self.get_logger().info("시간 초과, 회피경로 재탐색")
-          self.is_fail = True
-          return cx,cy,cyaw
+            # 탐색이 끝날 때까지 충돌하는 경로는 보내지 않음
+            return self.fallback_path(cx, cy, cyaw, first_hit)
 
         # resolution은 항상 self.W 보다 작아야함.
 
@@ -376,26 +437,112 @@ class LocalPathPlanner(Node):
         cx   = np.concatenate(( cx[0 : target_idx_e - step+1], rcx, cx[(target_idx_e + step+1) : ]))
         cy   = np.concatenate(( cy[0 : target_idx_e - step+1], rcy, cy[(target_idx_e + step+1) : ]))
         cyaw   = np.concatenate(( cyaw[0 : target_idx_e - step+1], rcyaw, cyaw[(target_idx_e + step+1) : ]))
+        self.last_clear_path = (cx, cy, cyaw) # 회피 구간은 reuse_reroute 에서 충돌 검사를 통과함
 
         # print('Generated dev path')
         return cx, cy, cyaw
 
+    def pose_close(self, a, b):
+        # a, b : (x, y, yaw[deg])
+        dyaw = (a[2] - b[2] + 180.0) % 360.0 - 180.0
+        return np.hypot(a[0] - b[0], a[1] - b[1]) <= self.reroute_pos_tol and abs(dyaw) <= self.reroute_yaw_tol
+
+    def path_collision_index(self, path, obstacle_index):
+        ''' path (x, y, yaw[rad]) 중 장애물과 처음 충돌하는 점의 index, 없으면 None '''
+        cars = [(p[0], p[1], p[2], self.L, self.W) for p in path]
+        hits = np.nonzero(obstacle_index.collision_matrix(cars).any(axis=1))[0]
+        if len(hits) > 0:
+            return int(hits[0])
+        return None
+
+    def reuse_reroute(self, start, end, obstacle_index):
+        '''
+        이전 회피경로를 현재 start/end 에 맞춰 재사용.
+        return : (경로, 현재 장애물과 처음 충돌하는 index 또는 None), 재사용할 수 없으면 (None, None)
+        '''
+        with self.reroute_lock:
+            cache = self.reroute_cache
+        if cache is None or cache['mode'] != self.mode or cache['W'] != self.W:
+            return None, None
+        if not (self.pose_close(cache['start'], start) and self.pose_close(cache['end'], end)):
+            return None, None
+
+        path = cache['path']
+        if len(path) < 2:
+            return None, None
+        path = [(start[0], start[1], np.deg2rad(start[2]))] + path[1:-1] + [(end[0], end[1], np.deg2rad(end[2]))]
+
+        return path, self.path_collision_index(path, obstacle_index)
+
+    def request_reroute(self, request):
+        with self.reroute_lock:
+            # 같은 구간을 이미 탐색 중이면 결과를 기다림
+            for pending in [self.reroute_running, self.reroute_request]:
+                if pending is not None and pending['mode'] == request['mode'] and pending['W'] == request['W'] and \
+                        self.pose_close(pending['start'], request['start']) and self.pose_close(pending['end'], request['end']):
+                    return
+
+            request['stamp'] = time.time()
+            self.reroute_request = request
+        self.reroute_event.set()
+
+    def reroute_worker(self):
+        while rclpy.ok():
+            if not self.reroute_event.wait(timeout=0.5):
+                continue
+
+            with self.reroute_lock:
+                request = self.reroute_request
+                self.reroute_request = None
+                self.reroute_running = request
+                self.reroute_event.clear()
+            if request is None:
+                continue
+
+            reroute_path = self.plan_reroute(request)
+            latency = time.time() - request['stamp']
+
+            with self.reroute_lock:
+                self.reroute_running = None
+                if reroute_path is not None:
+                    self.reroute_cache = {'mode': request['mode'], 'W': request['W'],
+                                          'start': request['start'], 'end': request['end'], 'path': reroute_path}
+
+            if reroute_path is None:
+                self.get_logger().info("시간 초과, 회피경로 재탐색")
+
+            msg = Float64()
+            msg.data = latency * 1000.0 # ms
+            self.reroute_latency_pub.publish(msg)
+
+    def plan_reroute(self, request):
+        region1_x, region2_x, region1_y, region2_y = request['region']
+        hy_a_star = hybrid_a_star(region1_x, region2_x,
+                                  region1_y, region2_y,
+                                  obstacle = request['obstacles'],
+                                  obstacle_index = request['obstacle_index'],
+                                  resolution = 1.0,
+                                  length = self.L, width = request['W'],
+                                  heuristic_table = self.heuristic_table)
+
+        prefix = request['prefix']
+        if len(prefix) > 0:
+            repair_start = prefix[-1]
+            repaired = hy_a_star.find_path((repair_start[0], repair_start[1], np.rad2deg(repair_start[2])),
+                                           request['end'], max_steer = 27)
+            if repaired is not None:
+                self.get_logger().info('reroute repaired from index %d' %(len(prefix) - 1))
+                return prefix[:-1] + repaired
+
+        return hy_a_star.find_path(request['start'], request['end'], max_steer = 27)
+
     def find_path(self):
-        self.is_fail = False
-        if len(self.ax) < 2:
+        if self.goal_path is None:
             return
-        cx_ = CubicSpline(range(len(self.ax)), self.ax)
-        cy_ = CubicSpline(range(len(self.ay)), self.ay)
-        dx = cx_(np.arange(0, len(self.ax) - 1, 0.1))
-        dy = cy_(np.arange(0, len(self.ay) - 1, 0.1))
-        cyaw = np.arctan2(dy[1:] - dy[:-1], dx[1:] - dx[:-1])
-        cx = dx[:-1]
-        cy = dy[:-1]
+        cx, cy, cyaw = self.goal_path
 
         if self.mode in ['dynamic', 'static1', 'tunnel', 'uturn'] or (self.mode == 'static0' and self.status in ['check','avoid']):
             cx, cy, cyaw = self.determine_path(cx, cy, cyaw)
-        if self.is_fail == True:
-            return
 
         obs = Obstacle()
         obs.detected = self.obstacle_detected
@@ -405,30 +552,28 @@ class LocalPathPlanner(Node):
 
         path_length = min(len(cx), len(cy), len(cyaw))
 
-        self.target_path = Path2D()
-        self.viz_path = Path()
+        self.target_path = path_to_msg(cx[:path_length], cy[:path_length], cyaw[:path_length])
+        self.local_planner_pub.publish(self.target_path)
+        self.path_viz_pub.publish(lambda: self.make_viz_path(cx, cy, cyaw, path_length))
 
-        self.viz_path.header.frame_id = "map"
-        self.viz_path.header.stamp = self.get_clock().now().to_msg()
+    def make_viz_path(self, cx, cy, cyaw, path_length):
+        viz_path = Path()
 
-        for n in range(0, path_length):
-            npose = Pose2D()
-            npose.x = cx[n]
-            npose.y = cy[n]
-            npose.theta = cyaw[n]
-            self.target_path.poses.append(npose)
+        stamp = self.get_clock().now().to_msg()
+        viz_path.header.frame_id = "map"
+        viz_path.header.stamp = stamp
 
+        for n in range(0, path_length):
             vpose = PoseStamped()
             vpose.header.frame_id = "map"
-            vpose.header.stamp = self.get_clock().now().to_msg()
+            vpose.header.stamp = stamp
             vpose.pose.position.x = cx[n]
             vpose.pose.position.y = cy[n]
             vpose.pose.position.z = 0.0
             vpose.pose.orientation = yaw_to_quaternion(np.pi * 0.5 - cyaw[n])
-            self.viz_path.poses.append(vpose)
+            viz_path.poses.append(vpose)
 
-        self.local_planner_pub.publish(self.target_path)
-        self.path_viz_pub.publish(self.viz_path)
+        return viz_path
 
 
 def main(args=None):
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# Splits /velodyne_points into per-ring and per-region sub-clouds with the
+# shared numpy extractor (autocar_nav.point_cloud) and publishes a summary
+# for each region. Replaces the per-point lidar_extract_channel scripts of
+# autocar_odom and adaptive_clustering; Localization uses the same
+# TUNNEL_CEILING region for its tunnel-exit check.
+
+import rclpy
+from rclpy.node import Node
+
+from std_msgs.msg import Float64MultiArray
+from sensor_msgs.msg import PointCloud2
+
+from autocar_nav.point_cloud import cloud_to_array, array_to_cloud, region_mask, split_rings, cloud_stats, Region, TUNNEL_CEILING
+
+
+class RingExtractor(Node):
+
+    def __init__(self):
+
+        super().__init__('ring_extractor')
+
+        # Load parameters
+        try:
+            self.declare_parameters(
+                namespace='',
+                parameters=[
+                    ('rings', [15]),
+                    ('regions', ['tunnel_ceiling'])
+                ]
+            )
+
+            self.rings = [ring for ring in self.get_parameter("rings").value if ring >= 0]
+            self.regions = {name: self.declare_region(name) for name in self.get_parameter("regions").value}
+
+        except ValueError:
+            raise Exception("Missing ROS parameters. Check the configuration file.")
+
+        # Initialise publishers
+        self.ring_pubs = {ring: self.create_publisher(PointCloud2, '/lidar/ring_%d' % ring, 10) for ring in self.rings}
+        self.region_pubs = {name: self.create_publisher(PointCloud2, '/lidar/' + name, 10) for name in self.regions}
+        self.stats_pubs = {name: self.create_publisher(Float64MultiArray, '/lidar/' + name + '/stats', 10) for name in self.regions}
+
+        # Initialise subscribers
+        self.lidar_sub = self.create_subscription(PointCloud2, '/velodyne_points', self.lidar_callback, 10)
+
+        for name, region in self.regions.items():
+            self.get_logger().info('region %s : rings %s, x %s, y %s, z %s' % (name, list(region.rings) or 'all', region.x, region.y, region.z))
+
+    def declare_region(self, name):
+        ''' <name>.rings / .x / .y / .z, 없는 값은 tunnel_ceiling 이면 TUNNEL_CEILING, 아니면 제한 없음 '''
+        default = TUNNEL_CEILING if name == 'tunnel_ceiling' else Region()
+        rings = self.declare_parameter(name + '.rings', list(default.rings) or [-1]).value
+        bounds = [self.declare_parameter(name + '.' + axis, [float(v) for v in getattr(default, axis)]).value for axis in ('x', 'y', 'z')]
+
+        for axis, bound in zip(('x', 'y', 'z'), bounds):
+            if len(bound) != 2 or bound[0] >= bound[1]:
+                raise ValueError('%s.%s must be [lower, upper], got %s' % (name, axis, list(bound)))
+
+        return Region(tuple(ring for ring in rings if ring >= 0), *(tuple(bound) for bound in bounds))
+
+    def lidar_callback(self, msg):
+        # 모든 field 를 그대로 가져가야 sub-cloud 에 intensity 등이 남음
+        cloud = cloud_to_array(msg, [field.name for field in msg.fields])
+
+        self.publish_rings(cloud, msg.header)
+
+        for name, region in self.regions.items():
+            points = cloud[region_mask(cloud, region)]
+
+            stats = Float64MultiArray()
+            stats.data = [float(value) for value in cloud_stats(points)] # count, z_min, z_mean, z_max, range_min
+            self.stats_pubs[name].publish(stats)
+
+            if self.region_pubs[name].get_subscription_count() > 0:
+                self.region_pubs[name].publish(array_to_cloud(points, msg.header))
+
+    def publish_rings(self, cloud, header):
+        # 구독자가 있는 ring 만, 하나면 mask 한 번, 여러 개면 정렬 한 번으로 나눔
+        rings = [ring for ring in self.rings if self.ring_pubs[ring].get_subscription_count() > 0]
+        if not rings:
+            return
+
+        if len(rings) == 1:
+            by_ring = {rings[0]: cloud[cloud['ring'] == rings[0]]}
+        else:
+            by_ring = split_rings(cloud)
+
+        for ring in rings:
+            points = by_ring.get(ring, cloud[:0])
+            self.ring_pubs[ring].publish(array_to_cloud(points, header))
+
+
+def main(args=None):
+
+    # Initialise the node
+    rclpy.init(args=args)
+
+    try:
+        # Initialise the class
+        ring_extractor = RingExtractor()
+
+        # Stop the node from exiting
+        rclpy.spin(ring_extractor)
+
+    finally:
+        ring_extractor.destroy_node()
+        rclpy.shutdown()
+
+if __name__ == "__main__":
+    main()
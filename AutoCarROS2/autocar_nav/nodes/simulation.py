@@ -135,6 +135,7 @@ class Simulation(Node):
     def update_state(self):
         # Define vehicle pose x,y, theta
         self.state2d = State2D()
+        self.state2d.header = self.state.header
         self.state2d.pose.x = self.state.pose.pose.position.x
         self.state2d.pose.y = self.state.pose.pose.position.y
         self.state2d.pose.theta = 2.0 * np.arctan2(self.state.pose.pose.orientation.z, self.state.pose.pose.orientation.w)
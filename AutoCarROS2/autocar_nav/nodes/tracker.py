@@ -1,16 +1,23 @@
 #!/usr/bin/env python3
 
-import threading
+import time
 import numpy as np
+from collections import namedtuple
 
 import rclpy
 from rclpy.node import Node
+from rclpy.executors import MultiThreadedExecutor
+from rclpy.callback_groups import MutuallyExclusiveCallbackGroup
+from rclpy.time import Time
 
 from std_msgs.msg import Float64, String
-from autocar_msgs.msg import Path2D, State2D, LinkArray
+from autocar_msgs.msg import CompactPath2D, State2D, LinkArray
 from ackermann_msgs.msg import AckermannDriveStamped
 
 from autocar_nav import normalise_angle
+from autocar_nav.path_msg import msg_to_arrays
+from autocar_nav.mpc_steering import LinearMPC
+from autocar_nav.window_search import WindowSearch
 
 
 class LowPassFilter:
@@ -25,6 +32,12 @@ class LowPassFilter:
         return self.filtered_angle
 
 
+# callback 에서 통째로 만들어서 교체만 하는 snapshot, 만든 뒤에는 수정하지 않음
+PathSnapshot = namedtuple('PathSnapshot', ['cx', 'cy', 'cyaw', 'rcx', 'rcy', 'rcyaw', 'cs', 'ck'])
+TrackingSnapshot = namedtuple('TrackingSnapshot', ['x', 'y', 'yaw', 'vel', 'crosstrack_error', 'heading_error',
+                                                   'target_idx', 'rear_idx', 'path'])
+
+
 class PathTracker(Node):
 
     def __init__(self):
@@ -35,10 +48,11 @@ class PathTracker(Node):
         self.tracker_pub = self.create_publisher(AckermannDriveStamped, '/autocar/ackermann_cmd', 10)
         self.ct_error_pub = self.create_publisher(Float64, '/autocar/cte_error', 10)
         self.h_error_pub = self.create_publisher(Float64, '/autocar/he_error', 10)
+        self.jitter_pub = self.create_publisher(Float64, '/autocar/tracker_jitter', 10)
 
         # Initialise subscribers
         self.localisation_sub = self.create_subscription(State2D, '/autocar/state2D', self.vehicle_state_cb, 10)
-        self.path_sub = self.create_subscription(Path2D, '/autocar/path', self.path_cb, 10)
+        self.path_sub = self.create_subscription(CompactPath2D, '/autocar/path', self.path_cb, 10)
         self.mission_status_sub = self.create_subscription(String, '/autocar/mission_status', self.mission_status_cb, 10)
         self.links_sub = self.create_subscription(LinkArray, '/autocar/mode', self.links_cb, 10)
         self.autocar_sub = self.create_subscription(AckermannDriveStamped, '/autocar/autocar_cmd', self.cmd_cb, 10)
@@ -63,19 +77,36 @@ class PathTracker(Node):
         except ValueError:
             raise Exception("Missing ROS parameters. Check the configuration file.")
 
+        # 지연 보상 : 고정 거리 대신 state 의 나이 + 조향 구동 지연 동안 bicycle model 로 앞으로 이동
+        self.latency_compensation = bool(self.declare_parameter('latency_compensation', False).value)
+        self.actuator_delay = float(self.declare_parameter('actuator_delay', 0.0).value) # [s], erp_control/delay_test.py 로 측정
+        self.max_state_age = float(self.declare_parameter('max_state_age', 0.5).value) # [s], 이보다 오래된 state 는 이 값으로 자름
+
+        # 조향 제어기 : 'stanley' 또는 'mpc' (후진은 항상 stanley)
+        self.controller = self.declare_parameter('controller', 'stanley').value
+        self.mpc = LinearMPC(self.L, self.max_steer, 1 / self.frequency,
+                             horizon=int(self.declare_parameter('mpc_horizon', 20).value),
+                             q_lateral=float(self.declare_parameter('mpc_q_lateral', 1.0).value),
+                             q_heading=float(self.declare_parameter('mpc_q_heading', 1.0).value),
+                             r_steer=float(self.declare_parameter('mpc_r_steer', 0.1).value),
+                             r_rate=float(self.declare_parameter('mpc_r_rate', 0.5).value))
+
         # Class variables to use whenever within the class when necessary
-        self.x = 0.0
-        self.y = 0.0
-        self.yaw = 0.0
-        self.vel = 0.0
-
-        self.cx = []
-        self.cy = []
-        self.cyaw = []
-
-        self.target_idx = None
-        self.heading_error = 0.0
-        self.crosstrack_error = 0.0
+        # path_cb 가 path 를, vehicle_state_cb 가 tracking 을 새로 만들어 교체하고 timer 는 읽기만 함 (lock 없음)
+        empty = np.zeros(0)
+        self.path = PathSnapshot(empty, empty, empty, empty, empty, empty, empty, empty) # cs : 누적 거리, ck : 곡률
+        self.tracking = TrackingSnapshot(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, None, None, self.path) # rear_idx : 전진일 때 MPC 기준점
+
+        self.steer_cmd = 0.0
+        self.mpc_active = False
+        self.last_tick = None
+
+        # 가장 가까운 waypoint 탐색 window, vehicle_state_cb 에서만 사용
+        # 뒤로는 front -> rear axle 거리(L) 만큼, 새 path 가 와도 이전 점 근처에서 이어서 탐색
+        self.search_path = None
+        self.search_reverse = False
+        self.forward_search = WindowSearch(behind_dist=self.L, ahead=40)
+        self.backward_search = WindowSearch(behind_dist=self.L, ahead=40) # 뒤집은 path
         self.k = {'global'    : {'Straight': 1.0, 'Curve': 1.0},
                   'parking'   : {'Straight': 1.5, 'Curve': 1.5},
                   'revpark'   : {'Straight': 1.5, 'Curve': 1.5},
@@ -91,7 +122,6 @@ class PathTracker(Node):
         self.ksoft = 0.1
         self.kyaw = 1.0
 
-        self.lock = threading.Lock()
         self.dt = 1 / self.frequency
         self.sigma = 0.0
         self.filter = LowPassFilter(cutoff_freq=4.3, update_rate=10.0)
@@ -100,8 +130,8 @@ class PathTracker(Node):
         self.mode = 'global'
         self.direction = 'Straight'
 
-        # Intialise timers
-        self.timer = self.create_timer(self.dt, self.stanley_control)
+        # Intialise timers, subscription 과 다른 callback group 이라 callback 이 길어져도 기다리지 않음
+        self.timer = self.create_timer(self.dt, self.stanley_control, callback_group=MutuallyExclusiveCallbackGroup())
 
     def cmd_cb(self, msg):
         input_steer = msg.drive.steering_angle
@@ -109,59 +139,76 @@ class PathTracker(Node):
         self.sigma = self.filter.update(input_steer)
 
     def vehicle_state_cb(self, msg):
-        self.lock.acquire()
+        path = self.path
+        if path is not self.search_path: # 새 path : 이전 index 의 점을 새 path 에서 찾아 이어서 탐색
+            spacing = path.cs[-1] / (len(path.cs) - 1) if len(path.cs) > 1 else 0.0
+            self.forward_search.set_path(path.cx, path.cy, spacing)
+            self.backward_search.set_path(path.rcx, path.rcy, spacing)
+            self.search_path = path
 
-        self.x = msg.pose.x
-        self.y = msg.pose.y
-        self.yaw = msg.pose.theta
-        self.vel = np.sqrt((msg.twist.x**2.0) + (msg.twist.y**2.0))
-        if self.vel <= 0.5: self.vel = 0.5
+        x = msg.pose.x
+        y = msg.pose.y
+        yaw = msg.pose.theta
+        vel = np.sqrt((msg.twist.x**2.0) + (msg.twist.y**2.0))
+        if vel <= 0.5: vel = 0.5
 
 
-        if self.cyaw:
+        if len(path.cyaw) > 0:
             if (self.mode == 'parking' and self.status == 'return') or (self.mode == 'revpark' and self.status == 'parking'):
-                d = -0.8
-                self.x = self.x + d * np.cos(self.yaw)
-                self.y = self.y + d * np.sin(self.yaw)
+                if self.latency_compensation:
+                    d = -vel * self.prediction_horizon(msg.header.stamp) # 후진
+                else:
+                    d = -0.8
+                x = x + d * np.cos(yaw)
+                y = y + d * np.sin(yaw)
 
                 d_yaw = d * np.tan(self.sigma) / self.L
-                self.yaw = self.yaw + d_yaw
+                yaw = yaw + d_yaw
 
-                self.target_index_calculator_backward()
+                self.tracking = self.target_index_calculator_backward(path, x, y, yaw, vel)
 
             else:
-                if self.mode == 'global' or self.vel > 10/3.6:
+                if self.latency_compensation or self.controller == 'mpc': # MPC 는 고정 거리 look-ahead 를 쓰지 않음
+                    d = vel * self.prediction_horizon(msg.header.stamp)
+                elif self.mode == 'global' or vel > 10/3.6:
                     d = 1.5
                 else:
                     d = 1
 
-                self.x = self.x + d * np.cos(self.yaw)
-                self.y = self.y + d * np.sin(self.yaw)
+                x = x + d * np.cos(yaw)
+                y = y + d * np.sin(yaw)
 
                 d_yaw = d * np.tan(self.sigma) / self.L
-                self.yaw = self.yaw + d_yaw
+                yaw = yaw + d_yaw
 
 
-                self.target_index_calculator()
+                self.tracking = self.target_index_calculator(path, x, y, yaw, vel)
 
-        self.lock.release()
+        else:
+            # path 가 없으면 오차는 그대로 두고 state 만 갱신, 이전 path 의 index 는 버림 (MPC 도 건너뜀)
+            self.tracking = self.tracking._replace(x=x, y=y, yaw=yaw, vel=vel, target_idx=None, rear_idx=None, path=path)
 
-    def path_cb(self, msg):
-        self.lock.acquire()
+    def prediction_horizon(self, stamp):
+        ''' state 측정 시각부터 조향이 실제로 적용될 때까지의 시간 [s] '''
+        age = 0.0
+        if stamp.sec != 0 or stamp.nanosec != 0: # stamp 가 없는 state 는 나이 0 으로
+            age = (self.get_clock().now() - Time.from_msg(stamp)).nanoseconds * 1e-9
+            age = min(max(age, 0.0), self.max_state_age)
 
-        self.cx = []
-        self.cy = []
-        self.cyaw = []
+        return age + self.actuator_delay
 
-        for i in range(0, len(msg.poses)):
-            px = msg.poses[i].x
-            py = msg.poses[i].y
-            ptheta = msg.poses[i].theta
-            self.cx.append(px)
-            self.cy.append(py)
-            self.cyaw.append(ptheta)
+    def path_cb(self, msg):
+        cx, cy, cyaw = msg_to_arrays(msg)
+
+        # MPC 가 앞으로 지나갈 곡률을 읽을 수 있게 누적 거리, 곡률을 한 번 계산
+        ds = np.hypot(np.diff(cx), np.diff(cy))
+        dyaw = np.diff(np.unwrap(cyaw))
+        cs = np.concatenate(([0.0], np.cumsum(ds)))
+        ck = np.append(np.divide(dyaw, ds, out=np.zeros_like(ds), where=ds > 1e-6), 0.0)
+        if len(ck) > 1: ck[-1] = ck[-2]
 
-        self.lock.release()
+        # 후진용 뒤집은 view (복사 없음), 다 만든 뒤 한 번에 교체
+        self.path = PathSnapshot(cx, cy, cyaw, cx[::-1], cy[::-1], cyaw[::-1], cs, ck)
 
     def mission_status_cb(self, msg):
         self.status = msg.data
@@ -171,77 +218,78 @@ class PathTracker(Node):
         self.direction = msg.direction
 
 
-    def target_index_calculator(self):
+    def target_index_calculator(self, path, x, y, yaw, vel):
 
         ''' Calculates the target index and each corresponding error '''
 
-        # Calculate position of the front axle
-        fx = self.x + self.FL * np.cos(self.yaw)
-        fy = self.y + self.FL * np.sin(self.yaw)
+        if self.search_reverse:
+            self.forward_search.reset()
+            self.search_reverse = False
 
-        dx = [fx - icx for icx in self.cx] # Find the x-axis of the front axle relative to the path
-        dy = [fy - icy for icy in self.cy] # Find the y-axis of the front axle relative to the path
+        c, s = np.cos(yaw), np.sin(yaw)
 
-        d = np.hypot(dx, dy) # Find the distance from the front axle to the path
-        target_idx = np.argmin(d) # Find the shortest distance in the array
+        # front axle, rear axle 위치를 같이 탐색
+        fx = x + self.FL * c
+        fy = y + self.FL * s
+        rx = x - (self.L - self.FL) * c # rear axle
+        ry = y - (self.L - self.FL) * s
 
-        # Cross track error, project RMS error onto the front axle vector
-        forward_vec = [np.sin(self.yaw), -np.cos(self.yaw)] # normal vector
-        self.crosstrack_error = np.dot([dx[target_idx], dy[target_idx]], forward_vec)
+        ids, dx, dy = self.forward_search.nearest((fx, rx), (fy, ry))
 
-        if self.mode != 'global':
-            # Calculate position of the rear axle
-            rx = self.x - (self.L - self.FL) * np.cos(self.yaw) # rear axle
-            ry = self.y - (self.L - self.FL) * np.sin(self.yaw)
-
-            dx = [rx - icx for icx in self.cx]
-            dy = [ry - icy for icy in self.cy]
+        # Cross track error, project RMS error onto the front axle vector
+        crosstrack_error = dx[0] * s - dy[0] * c # normal vector (sin, -cos)
 
-            d = np.hypot(dx, dy)
-            target_idx = np.argmin(d)
+        # global 은 front axle, 나머지는 rear axle 기준 heading error
+        target_idx = int(ids[0]) if self.mode == 'global' else int(ids[1])
 
         # Heading error
-        self.heading_error = normalise_angle(self.cyaw[target_idx] - self.yaw)
+        heading_error = normalise_angle(path.cyaw[target_idx] - yaw)
 
-        self.target_idx = target_idx
+        return TrackingSnapshot(x, y, yaw, vel, crosstrack_error, heading_error, target_idx, int(ids[1]), path)
 
-    def target_index_calculator_backward(self):
+    def target_index_calculator_backward(self, path, x, y, yaw, vel):
 
         ''' Calculates the target index and each corresponding error '''
 
-        # Calculate position of the front axle of backward
-        bx = self.x - (2 * self.L - self.FL) * np.cos(self.yaw) # 후진을 위한 가상의 front axle 설정
-        by = self.y - (2 * self.L - self.FL) * np.sin(self.yaw)
+        if not self.search_reverse:
+            self.backward_search.reset()
+            self.search_reverse = True
 
-        dx = [bx - icx for icx in self.cx[::-1]] # waypoints 순서를 반대로 뒤집기
-        dy = [by - icy for icy in self.cy[::-1]]
+        c, s = np.cos(yaw), np.sin(yaw)
 
-        d = np.hypot(dx, dy)
-        target_idx = np.argmin(d)
+        # 후진을 위한 가상의 front axle, rear axle 위치를 같이 탐색
+        bx = x - (2 * self.L - self.FL) * c
+        by = y - (2 * self.L - self.FL) * s
+        rx = x - (self.L - self.FL) * c
+        ry = y - (self.L - self.FL) * s
 
-        # Cross track error at front axle of backward
-        backward_vec = [np.sin(self.yaw), -np.cos(self.yaw)] # normal vector
-        self.crosstrack_error = np.dot([dx[target_idx], dy[target_idx]], backward_vec)
-
-        # Calculate position of the rear axle
-        rx = self.x - (self.L - self.FL) * np.cos(self.yaw) # rear axle
-        ry = self.y - (self.L - self.FL) * np.sin(self.yaw)
+        # waypoints 순서를 반대로 뒤집은 view 에서 탐색
+        ids, dx, dy = self.backward_search.nearest((bx, rx), (by, ry))
 
-        dx = [rx - icx for icx in self.cx[::-1]]
-        dy = [ry - icy for icy in self.cy[::-1]]
+        # Cross track error at front axle of backward
+        crosstrack_error = dx[0] * s - dy[0] * c # normal vector (sin, -cos)
 
-        d = np.hypot(dx, dy)
-        target_idx = np.argmin(d)
+        target_idx = int(ids[1])
 
         # Heading error
-        self.heading_error = normalise_angle(self.yaw - self.cyaw[::-1][target_idx]) # waypoints 순서를 반대로 뒤집은 후, yaw과 비교
-        self.target_idx = target_idx
+        heading_error = normalise_angle(yaw - path.rcyaw[target_idx]) # 뒤집은 waypoints 의 yaw 와 비교
+
+        return TrackingSnapshot(x, y, yaw, vel, crosstrack_error, heading_error, target_idx, None, path) # 후진은 MPC 안 씀
 
     def stanley_control(self):
 
-        self.lock.acquire()
-        crosstrack_term = np.arctan2((self.k[self.mode][self.direction] * self.crosstrack_error), (self.ksoft + self.vel))
-        heading_term = normalise_angle(self.kyaw * self.heading_error)
+        # timer 주기 흔들림 [ms]
+        now = time.monotonic()
+        if self.last_tick is not None:
+            jitter = Float64()
+            jitter.data = (now - self.last_tick - self.dt) * 1000.0
+            self.jitter_pub.publish(jitter)
+        self.last_tick = now
+
+        tracking = self.tracking # 이번 tick 동안 쓸 snapshot
+
+        crosstrack_term = np.arctan2((self.k[self.mode][self.direction] * tracking.crosstrack_error), (self.ksoft + tracking.vel))
+        heading_term = normalise_angle(self.kyaw * tracking.heading_error)
 
         cte = Float64()
         cte.data = np.rad2deg(crosstrack_term)
@@ -256,6 +304,11 @@ class PathTracker(Node):
 
         sigma_t = crosstrack_term + heading_term
 
+        if self.controller == 'mpc' and tracking.rear_idx is not None: # 후진 중에는 rear_idx 가 None
+            if not self.mpc_active: self.mpc.reset() # 후진 후 다시 전진하면 warm start 를 버림
+            sigma_t = self.mpc_control(tracking)
+        self.mpc_active = tracking.rear_idx is not None
+
         # Constrains steering angle to the vehicle limits
         if sigma_t >= self.max_steer:
             sigma_t = self.max_steer
@@ -272,8 +325,24 @@ class PathTracker(Node):
             else:
                 self.kyaw = 1.0
 
+        self.steer_cmd = sigma_t
         self.set_vehicle_command(sigma_t)
-        self.lock.release()
+
+    def mpc_control(self, tracking):
+        ''' rear axle 기준 경로 오차와 앞으로의 경로 곡률로 LinearMPC 조향 '''
+        path = tracking.path
+        i = tracking.rear_idx
+        rx = tracking.x - (self.L - self.FL) * np.cos(tracking.yaw)
+        ry = tracking.y - (self.L - self.FL) * np.sin(tracking.yaw)
+
+        c, s = np.cos(path.cyaw[i]), np.sin(path.cyaw[i])
+        lateral_error = (ry - path.cy[i]) * c - (rx - path.cx[i]) * s # 경로 왼쪽 +
+        heading_error = normalise_angle(tracking.yaw - path.cyaw[i])
+
+        curvature = np.interp(path.cs[i] + tracking.vel * self.dt * np.arange(self.mpc.N), path.cs, path.ck)
+        steer, _ = self.mpc.solve(lateral_error, heading_error, tracking.vel, curvature, self.steer_cmd)
+
+        return steer
 
 
     # Publishes to vehicle state
@@ -298,8 +367,10 @@ def main(args=None):
         # Initialise the class
         path_tracker = PathTracker()
 
-        # Stop the node from exiting
-        rclpy.spin(path_tracker)
+        # Stop the node from exiting, 제어 timer 와 callback 을 다른 thread 에서 실행
+        executor = MultiThreadedExecutor(num_threads=2)
+        executor.add_node(path_tracker)
+        executor.spin()
 
     finally:
         path_tracker.destroy_node()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# MissionEngine against the if / elif Core.autocar_control it replaced.
+# LegacyCore is that method transcribed with time.time() swapped for a
+# ManualClock, so random input sequences can be replayed through both and
+# compared tick by tick. The targeted cases pin the rule flags that have no
+# plain if / elif equivalent (chain, last) and never-started timers.
+
+import random
+
+from autocar_nav.mission import MissionEngine, MissionInputs
+from autocar_nav.node_clock import ManualClock
+
+
+TARGET_SPEED = {'global': 15/3.6, 'curve': 6/3.6, 'traffic': 10/3.6, 'finish': 15/3.6, 'revpark': 8/3.6, 'parking': 6/3.6,
+                'uturn': 15/3.6, 'track': 12/3.6, 'dynamic': 6/3.6, 'static0': 6/3.6, 'static1': 6/3.6, 'tunnel': 10/3.6,
+                'tollgate': 15/3.6, 'regular': 10/3.6, 'delivery_A': 4/3.6, 'delivery_B': 4/3.6}
+
+MODES = ['global', 'uturn', 'tunnel', 'static0', 'static1', 'revpark', 'delivery_A', 'delivery_B', 'finish', 'tollgate']
+LIGHTS = ['Green', 'Left', 'Red', 'Straightleft', 'Yellow', 'None']
+
+
+class LegacyCore:
+    ''' table 이전 Core.autocar_control (주석 처리된 블록 제외), 시각은 clock 에서 '''
+    def __init__(self, clock, queue_size=35):
+        self.clock = clock
+        self.target_speed = TARGET_SPEED
+        self.link_change = [0] * queue_size
+        self.queue_size = queue_size
+        self.status = 'driving'
+        self.gear = 0.0
+        self.traffic_stop = False
+        self.traffic_pass = False
+        self.mission_count = 0
+        self.stop_wp = 1e3
+        # 노드에서는 0.0 (epoch), 즉 아주 오래 전
+        self.pause = self.avoid_count = self.parking_time = float('-inf')
+
+    def observe_link(self, link_num):
+        self.link_change = (self.link_change + [link_num])[-self.queue_size:]
+
+    def identify_traffic_light(self, path):
+        if path == 'straight': tf_light = ['Green', 'Straightleft', 'None']
+        elif path == 'left': tf_light = ['Left', 'Straightleft', 'None']
+        elif path == 'right':
+            if self.clock.now() - self.pause < 3.5:
+                tf_light = []
+            else:
+                tf_light = ['Green', 'Left', 'Red', 'Straightleft', 'Yellow', 'None']
+        else: tf_light = ['Green', 'Left', 'Red', 'Straightleft', 'Yellow', 'None']
+
+        if self.link_num == 6 and 'Left' in self.yolo_light:
+            self.traffic_pass = True
+        elif self.link_num != 6:
+            self.traffic_pass = False
+
+        if len([i for i in self.yolo_light if i in tf_light]) == 0:
+            self.traffic_stop = not self.traffic_pass
+        else:
+            self.traffic_stop = False
+
+    def traffic_window(self, *windows):
+        if any(lo <= self.traffic_stop_wp <= hi for lo, hi in windows):
+            self.identify_traffic_light(self.next_path)
+        else:
+            self.traffic_stop = False
+            self.pause = self.clock.now()
+
+    def autocar_control(self, inputs):
+        for name, value in inputs._asdict().items():
+            setattr(self, name, value)
+        self.cmd_speed = self.target_speed[self.mode]
+        self.cmd_steer = self.steer
+        now = self.clock.now
+
+        # Counter.most_common : 동률이면 먼저 나온 값
+        value = max(self.link_change, key=lambda v: (self.link_change.count(v), -self.link_change.index(v)))
+        if value != self.link_num:
+            self.status = 'driving'
+            self.traffic_stop = False
+            self.pause = now()
+
+        if self.mode == 'global':
+            self.status = 'driving'
+            if self.link_num == 3:
+                self.cmd_speed = self.target_speed['traffic']
+            if self.link_num == 7 and self.traffic_stop_wp <= 40:
+                self.cmd_speed = self.target_speed['curve']
+            if self.next_path != 'none' and self.traffic_stop_wp <= 15:
+                self.cmd_speed = self.target_speed['traffic']
+                self.traffic_window((3, 8))
+
+        elif self.mode == 'uturn':
+            if self.status == 'driving':
+                if self.traffic_stop_wp <= 0:
+                    self.status = 'complete'
+                if self.waypoint >= 20:
+                    if self.obs_distance < 15:
+                        self.cmd_speed = self.target_speed['track']
+                    if self.obs_distance < 7:
+                        self.status = 'track'
+            elif self.status == 'track':
+                self.cmd_speed = self.target_speed['track']
+                self.cmd_steer = self.track_steer
+                if self.waypoint > 230 and abs(self.cte_term) <= 10:
+                    self.avoid_count = now()
+                    self.status = 'complete'
+            else:
+                if now() - self.avoid_count < 2:
+                    self.cmd_speed = self.target_speed['track']
+
+        elif self.mode == 'tunnel':
+            if self.status == 'driving':
+                if self.waypoint >= 15:
+                    self.status = 'lanenet'
+            elif self.status == 'lanenet':
+                if self.obstacle == 'dynamic':
+                    self.mission_count += 1
+                    self.avoid_count = now()
+                    self.status = 'stop'
+                if self.obstacle == 'static':
+                    self.mission_count += 1
+                    self.avoid_count = now()
+                    self.status = 'avoid'
+                if self.traffic_stop_wp <= 35:
+                    self.status = 'complete'
+            elif self.status == 'stop':
+                self.cmd_speed = 0.0
+                self.cmd_steer = 0.0
+                if self.obstacle == 'dynamic':
+                    self.avoid_count = now()
+                if now() - self.avoid_count >= 1.5:
+                    self.status = 'lanenet'
+            elif self.status == 'avoid':
+                self.cmd_speed = self.target_speed['static0']
+                if self.obstacle == 'static':
+                    self.avoid_count = now()
+                if now() - self.avoid_count >= 3:
+                    self.status = 'lanenet'
+
+        elif self.mode == 'static0':
+            if self.status == 'driving':
+                self.cmd_speed = self.target_speed['tunnel']
+                if self.waypoint >= 20:
+                    self.status = 'check'
+            elif self.status == 'check':
+                self.cmd_speed = self.target_speed['tunnel']
+                if 25 <= self.waypoint <= 57:
+                    self.cmd_speed = self.target_speed['static0']
+                elif self.traffic_stop_wp < 30:
+                    self.status = 'complete'
+                elif self.obstacle_detected:
+                    self.avoid_count = now()
+                    self.status = 'avoid'
+            elif self.status == 'avoid':
+                if self.obstacle_detected:
+                    self.avoid_count = now()
+                if now() - self.avoid_count >= 3:
+                    self.status = 'check'
+            else:
+                self.cmd_speed = self.target_speed['traffic']
+                self.traffic_window((3, 7), (19, 23))
+
+        elif self.mode == 'static1':
+            if self.status == 'driving':
+                self.cmd_speed = self.target_speed['global']
+                if self.waypoint >= 20:
+                    self.status = 'check'
+            if self.status == 'check':
+                self.cmd_speed = self.target_speed['tunnel']
+                if self.traffic_stop_wp <= 15:
+                    self.status = 'complete'
+                elif self.obstacle_detected:
+                    self.avoid_count = now()
+                    self.status = 'avoid'
+            elif self.status == 'avoid':
+                if self.obstacle_detected:
+                    self.avoid_count = now()
+                if now() - self.avoid_count >= 3:
+                    self.status = 'check'
+            else:
+                self.cmd_speed = self.target_speed['traffic']
+                self.traffic_window((3, 8))
+
+        elif self.mode == 'revpark':
+            if self.status == 'driving':
+                if self.traffic_stop_wp <= 8:
+                    self.parking_time = now()
+                    self.status = 'parking'
+                if self.waypoint >= 60:
+                    self.status = 'complete'
+            elif self.status == 'parking':
+                self.cmd_speed = self.target_speed['parking']
+                self.gear = 2.0
+                if now() - self.parking_time < 2:
+                    self.cmd_speed = 0.0
+                    self.cmd_steer = 0.0
+                elif self.parking_stop_wp <= 7:
+                    self.parking_time = now()
+                    self.status = 'return'
+            elif self.status == 'return':
+                self.cmd_speed = self.target_speed['parking']
+                self.gear = 0.0
+                if now() - self.parking_time <= 11:
+                    self.cmd_speed = 0.0
+                    self.cmd_steer = 0.0
+                elif self.parking_stop_wp <= 9:
+                    self.cmd_steer = 0.45
+                elif self.parking_stop_wp >= 21:
+                    self.status = 'complete'
+            else:
+                self.cmd_speed = self.target_speed['global']
+
+        elif self.mode in ['delivery_A', 'delivery_B']:
+            a = self.mode == 'delivery_A'
+            if self.status == 'driving':
+                if self.waypoint > 45:
+                    self.status = 'check'
+                elif self.waypoint < (25 if a else 23):
+                    self.cmd_speed = self.target_speed['regular']
+            elif self.status == 'check':
+                if self.distance != -1:
+                    self.stop_wp = self.waypoint + int(self.distance)
+                    self.status = 'detected'
+                if a and self.sign_pose >= 500:
+                    self.parking_time = now()
+                    self.status = 'stop'
+                if self.traffic_stop_wp <= (20 if a else 70):
+                    self.status = 'complete'
+            elif self.status == 'detected':
+                if self.stop_wp - self.waypoint <= 0:
+                    self.parking_time = now()
+                    self.status = 'stop'
+                elif self.traffic_stop_wp <= (15 if a else 55):
+                    self.status = 'complete'
+            elif self.status == 'stop':
+                self.cmd_speed = 0.0
+                self.cmd_steer = 0.0
+                if now() - self.parking_time >= 5:
+                    self.status = 'complete'
+            else:
+                self.cmd_speed = self.target_speed['curve']
+                if not a:
+                    if self.traffic_stop_wp <= 20:
+                        self.cmd_speed = self.target_speed['traffic']
+                    self.traffic_window((3, 8))
+
+        elif self.mode == 'finish':
+            if self.traffic_stop_wp <= 0:
+                self.status = 'complete'
+                self.cmd_speed = 0.0
+                self.cmd_steer = 0.0
+
+        return (self.cmd_speed, self.cmd_steer, self.gear, self.status, self.traffic_stop)
+
+
+def random_inputs(rng, mode, link, waypoint, traffic_stop_wp):
+    return MissionInputs(
+        mode=mode, link_num=link, waypoint=waypoint if rng.random() > 0.1 else rng.randrange(300),
+        traffic_stop_wp=traffic_stop_wp, parking_stop_wp=rng.uniform(0, 25),
+        next_path=rng.choice(['straight', 'left', 'right', 'none']), steer=rng.uniform(-0.4, 0.4),
+        cte_term=rng.uniform(-20, 20), obstacle_detected=rng.random() < 0.2,
+        obstacle=rng.choice(['None', 'None', 'None', 'dynamic', 'static']), obs_distance=rng.uniform(0, 30),
+        track_steer=rng.uniform(-0.4, 0.4), yolo_light=tuple(rng.sample(LIGHTS, rng.randrange(1, 3))),
+        distance=rng.choice([-1.0, -1.0, rng.uniform(0, 10)]), sign_pose=rng.uniform(0, 640))
+
+
+def test_replay_matches_legacy_control():
+    rng = random.Random(0)
+    visited = set()
+    for _ in range(100):
+        clock = ManualClock(0.0)
+        engine = MissionEngine(TARGET_SPEED)
+        legacy = LegacyCore(clock)
+
+        mode, link, waypoint, traffic_stop_wp = rng.choice(MODES), rng.randrange(9), 0, rng.uniform(-5, 100)
+        for tick in range(400):
+            clock.advance(rng.choice([0.05, 0.1, 0.5, 1.0]))
+            if rng.random() < 0.01:
+                mode, link, waypoint = rng.choice(MODES), rng.randrange(9), 0
+            waypoint += rng.choice([0, 1, 2])
+            traffic_stop_wp -= rng.choice([0, 0.5, 1])
+            if rng.random() < 0.02:
+                traffic_stop_wp = rng.uniform(-5, 100)
+            if rng.random() < 0.5:
+                engine.observe_link(link)
+                legacy.observe_link(link)
+
+            inputs = random_inputs(rng, mode, link, waypoint, traffic_stop_wp)
+            command = engine.step(inputs, clock.now())
+            expected = legacy.autocar_control(inputs)
+
+            assert tuple(command) == expected, (mode, tick, inputs)
+            assert engine.context.mission_count == legacy.mission_count
+            visited.add((mode, command.status))
+
+    # 모든 mission 의 주요 status 를 실제로 지나갔는지
+    for state in [('static1', 'check'), ('static1', 'avoid'), ('revpark', 'parking'), ('revpark', 'return'),
+                  ('tunnel', 'stop'), ('uturn', 'track'), ('delivery_A', 'stop'), ('delivery_B', 'detected')]:
+        assert state in visited
+
+
+def step(engine, clock, **values):
+    return engine.step(MissionInputs(**values), clock.now())
+
+
+def test_static1_driving_chains_into_check():
+    # waypoint 20 이 되는 tick 에 check 규칙까지 실행 (기존 if / if)
+    clock = ManualClock()
+    engine = MissionEngine(TARGET_SPEED)
+    command = step(engine, clock, mode='static1', waypoint=20)
+    assert command.status == 'check'
+    assert command.speed == TARGET_SPEED['tunnel']
+
+    engine = MissionEngine(TARGET_SPEED)
+    command = step(engine, clock, mode='static1', waypoint=20, traffic_stop_wp=10)
+    assert command.status == 'complete'
+
+    engine = MissionEngine(TARGET_SPEED)
+    command = step(engine, clock, mode='static1', waypoint=20, obstacle_detected=True)
+    assert command.status == 'avoid'
+
+    # check 로 넘어가지 않으면 complete 블록 (traffic 속도)
+    engine = MissionEngine(TARGET_SPEED)
+    command = step(engine, clock, mode='static1', waypoint=10)
+    assert command.status == 'driving'
+    assert command.speed == TARGET_SPEED['traffic']
+
+
+def test_revpark_elif_chains():
+    clock = ManualClock(100.0)
+    engine = MissionEngine(TARGET_SPEED)
+    assert step(engine, clock, mode='revpark', traffic_stop_wp=5).status == 'parking'
+
+    # 처음 2 초는 정지만, parking_stop_wp 가 작아도 return 으로 가지 않음
+    clock.advance(1.0)
+    command = step(engine, clock, mode='revpark', parking_stop_wp=5, steer=0.3)
+    assert (command.speed, command.steer, command.gear, command.status) == (0.0, 0.0, 2.0, 'parking')
+
+    clock.advance(1.5)
+    command = step(engine, clock, mode='revpark', parking_stop_wp=5, steer=0.3)
+    assert (command.speed, command.gear, command.status) == (TARGET_SPEED['parking'], 2.0, 'return')
+
+    # return : 11 초 정지 -> parking_stop_wp <= 9 면 조향만 -> 21 이상이면 complete
+    clock.advance(11.0)
+    command = step(engine, clock, mode='revpark', parking_stop_wp=25, steer=0.3)
+    assert (command.speed, command.steer, command.status) == (0.0, 0.0, 'return')
+
+    clock.advance(0.5)
+    command = step(engine, clock, mode='revpark', parking_stop_wp=8, steer=0.3)
+    assert (command.speed, command.steer, command.gear, command.status) == (TARGET_SPEED['parking'], 0.45, 0.0, 'return')
+
+    command = step(engine, clock, mode='revpark', parking_stop_wp=25, steer=0.3)
+    assert (command.steer, command.status) == (0.3, 'complete')
+
+
+def test_unstarted_timers_are_long_ago():
+    # now = 0 에서도 시작한 적 없는 timer 는 이미 충분히 지난 것으로
+    clock = ManualClock(0.0)
+    engine = MissionEngine(TARGET_SPEED)
+    assert engine.context.elapsed('avoid') == float('inf')
+
+    assert step(engine, clock, mode='uturn', traffic_stop_wp=0).status == 'complete'
+    command = step(engine, clock, mode='uturn', traffic_stop_wp=0)
+    assert command.speed == TARGET_SPEED['uturn'] # 'avoid' 는 시작 전이라 track 속도 아님
+
+    engine = MissionEngine(TARGET_SPEED)
+    engine.context.status = 'avoid'
+    assert step(engine, clock, mode='static0').status == 'check'
+
+    # restart 한 뒤에는 실제 경과 시간
+    engine.context.restart('avoid')
+    engine.context.status = 'avoid'
+    clock.advance(1.0)
+    assert step(engine, clock, mode='static0').status == 'avoid'
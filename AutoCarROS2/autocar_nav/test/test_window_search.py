@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+#-*- coding: utf-8 -*-
+
+# WindowSearch fed the way the tracker sees it: the global planner slides a
+# goal window along the map, the local planner re-splines it and publishes a
+# new path every tick, and the tracker queries front and rear axle. Every
+# answer must equal the brute-force argmin, and after the first fix the
+# window (not a full scan) must be what produced it.
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from autocar_nav.window_search import WindowSearch
+
+
+L = 1.04 # rearaxle_to_frontaxle (navigation_params.yaml)
+
+
+WP = 0.5 # map waypoint 간격 [m], spline 간격은 그 1/10
+
+
+def track(n=800):
+    ''' WP 간격 waypoint 의 S 자 map '''
+    s = np.arange(n) * WP
+    return s, 15.0 * np.sin(s / 40.0)
+
+
+def local_path(mx, my, start, stop):
+    ''' localplanner.goals_cb 와 같은 0.1 간격 spline '''
+    ax, ay = mx[start:stop], my[start:stop]
+    cx_ = CubicSpline(range(len(ax)), ax)
+    cy_ = CubicSpline(range(len(ay)), ay)
+    dx = cx_(np.arange(0, len(ax) - 1, 0.1))
+    dy = cy_(np.arange(0, len(ay) - 1, 0.1))
+    return dx[:-1], dy[:-1]
+
+
+def brute_force(px, py, cx, cy):
+    return np.argmin(np.hypot(np.asarray(px)[:, None] - cx, np.asarray(py)[:, None] - cy), axis=1)
+
+
+def drive(search, mx, my, ticks=300, speed=0.4):
+    ''' 매 tick 새 path 를 받고 front / rear axle 을 탐색, return : tick 별 (front, rear) index '''
+    x = 10.0
+    for tick in range(ticks):
+        x += speed
+        closest = int(round(x / WP))
+        cx, cy = local_path(mx, my, closest - 5, closest + 20) # wp_behind, wp_ahead
+
+        spacing = np.hypot(np.diff(cx), np.diff(cy)).sum() / (len(cx) - 1)
+        search.set_path(cx, cy, spacing)
+
+        fx, fy = x, 15.0 * np.sin(x / 40.0) + 0.3
+        yaw = np.arctan2(np.cos(x / 40.0) * 15.0 / 40.0, 1.0)
+        rx, ry = fx - L * np.cos(yaw), fy - L * np.sin(yaw)
+
+        ids, dx, dy = search.nearest((fx, rx), (fy, ry))
+        assert list(ids) == list(brute_force((fx, rx), (fy, ry), cx, cy)), tick
+        assert np.allclose(dx, np.array((fx, rx)) - cx[ids])
+        assert np.allclose(dy, np.array((fy, ry)) - cy[ids])
+
+
+def test_window_follows_consecutive_paths():
+    mx, my = track()
+    search = WindowSearch(behind_dist=L)
+    drive(search, mx, my)
+
+    # 처음 한 번만 전체 탐색, 이후 새 path 마다 이전 점에서 이어서 window 탐색
+    assert search.full_scans == 1
+    assert search.window_scans == 299
+
+
+def test_behind_covers_rear_axle():
+    mx, my = track()
+    search = WindowSearch(behind_dist=L)
+    search.set_path(*local_path(mx, my, 0, 30), WP / 10)
+    assert search.behind * WP / 10 > L
+
+    # behind 가 rear axle 에 못 미치면 (예전 고정 10) window 끝에 걸려 매번 전체 탐색
+    short = WindowSearch(behind_dist=0.0, margin=10)
+    drive(short, mx, my, ticks=50)
+    assert short.window_scans < short.full_scans
+
+
+def test_unrelated_path_falls_back_to_full_scan():
+    mx, my = track()
+    search = WindowSearch(behind_dist=L)
+    search.set_path(*local_path(mx, my, 20, 45), WP / 10)
+    search.nearest((15.0,), (15.0 * np.sin(15.0 / 40.0),))
+
+    # 멀리 떨어진 구간의 path 가 오면 이전 index 를 버리고 전체 탐색
+    cx, cy = local_path(mx, my, 400, 425)
+    search.set_path(cx, cy, WP / 10)
+    assert search.index is None
+
+    px, py = 205.0, 15.0 * np.sin(205.0 / 40.0)
+    ids, _, _ = search.nearest((px,), (py,))
+    assert ids[0] == brute_force((px,), (py,), cx, cy)[0]
+    assert search.full_scans == 2
@@ -20,6 +20,7 @@ from tf2_ros import StaticTransformBroadcaster, TransformBroadcaster
 
 from autocar_nav.normalise_angle import normalise_angle
 from autocar_nav.quaternion import yaw_to_quaternion, euler_from_quaternion
+from autocar_nav.node_clock import NodeClock
 
 class odomPublisher(Node):
 
@@ -84,14 +85,16 @@ class odomPublisher(Node):
 		self.dx_key_offset = 0.0
 		self.dy_key_offset = 0.0
 
+		# stamp 은 publish 할 때마다 node clock (use_sim_time 이면 /clock) 으로
+		self.clock = NodeClock(self)
 		self.gpose = Odometry()
-		self.gpose.header.stamp = self.get_clock().now().to_msg()
+		self.gpose.header.stamp = self.clock.stamp()
 		self.gpose.header.frame_id = 'odom'
 		self.gps_data = Odometry()
-		self.gps_data.header.stamp = self.get_clock().now().to_msg()
+		self.gps_data.header.stamp = self.clock.stamp()
 		self.gps_data.header.frame_id = 'odom'
 		self.imu_data = Imu()
-		self.imu_data.header.stamp = self.get_clock().now().to_msg()
+		self.imu_data.header.stamp = self.clock.stamp()
 		self.imu_data.header.frame_id = 'odom_footprint'
 
 
@@ -103,7 +106,7 @@ class odomPublisher(Node):
 		self.corr = self.get_parameter('corr').value
 		self.add_on_set_parameters_callback(self.update_parameter)
 		self.status = 'driving'
-		self.time = 0
+		self.corr_start = None # uturn 보정 주기 시작 시각 [s]
 		self.corr_uturn = False
 
 		#self.odom_pub = self.create_publisher(Odometry, '/odometry/filtered', qos_profile)
@@ -169,6 +172,7 @@ class odomPublisher(Node):
 			self.corr_mode = False
 
 		#publish for dead reckoning
+		self.gps_data.header.stamp = self.clock.stamp()
 		self.gps_data.pose.pose.position.x = x
 		self.gps_data.pose.pose.position.y = y
 		self.data_pub_gps.publish(self.gps_data)
@@ -262,8 +266,9 @@ class odomPublisher(Node):
 			self.yaw_offset_array.clear()
 
 		if msg.mode == 'uturn':
+			if self.corr_start is None:
+				self.corr_start = self.clock.now()
 			self.yaw_correction()
-			self.time += 1
 
 		# 본선
 		# if msg.direction == 'Straight' and self.velocity > 12/3.6:
@@ -293,21 +298,22 @@ class odomPublisher(Node):
 	def yaw_correction(self):
 
 		corr_length = 20 # 보정할 때 offset값을 얼마나 보관할 것인가, 리스트 길이(너무 짧으면 부정확할 수 있음)
-		time_period = 20 #보정할 주기 2초
+		time_period = 2.0 #보정할 주기 2초
 		# corr true면 보정하고 offset 쌓인 리스트 비워줌. 시간 초기화
 		if self.corr_uturn == True:
 			self.yaw_offset_av = sum(self.yaw_offset_array)/len(self.yaw_offset_array)
 			self.yaw_init -= np.rad2deg(self.yaw_offset_av)
 			#reset variable
 			self.corr_uturn = False
-			self.time = 0
+			self.corr_start = self.clock.now()
 			self.yaw_offset_array.clear()
 
 		# corr 모드(correction 모드) 일때만 yaw offset array에 yaw offset 추가
-		if len(self.yaw_offset_array) > corr_length and self.time > time_period:
+		elapsed = self.clock.since(self.corr_start)
+		if len(self.yaw_offset_array) > corr_length and elapsed > time_period:
 			self.corr_uturn = True
 
-		self.get_logger().info(f'time : {self.time}')
+		self.get_logger().info(f'time : {elapsed:.1f}')
 		self.get_logger().info(f'len : {len(self.yaw_offset_array)}')
 		self.get_logger().info(f'corr_mode : {self.corr_uturn}')
 
@@ -329,6 +335,7 @@ class odomPublisher(Node):
 		self.gpose.pose.pose.orientation.w= imu_quat.w
 
 		#pub imu for EKF
+		self.imu_data.header.stamp = self.clock.stamp()
 		self.imu_data.orientation.x= imu_quat.x
 		self.imu_data.orientation.y= imu_quat.y
 		self.imu_data.orientation.z= imu_quat.z
@@ -347,6 +354,7 @@ class odomPublisher(Node):
 		#self.get_logger().info('yaw_offset_av: %s' % self.yaw_offset_array)
 		#self.get_logger().info('yaw_offset_av: %s' % self.yaw_offset_array)
 		#self.get_logger().info(f'yaw_offset : {round(np.rad2deg(-self.yaw_offset),2)}\t offset_av : {round(np.rad2deg(-self.yaw_offset_av),2)}\t yaw_init : {round(self.yaw_init,2)}')
+		self.gpose.header.stamp = self.clock.stamp()
 		self.odom_pub.publish(self.gpose)
 		self.odom_pub.publish(self.gpose)
 
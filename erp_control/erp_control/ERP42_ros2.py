@@ -2,7 +2,6 @@
 # -*- coding: utf8 -*-
 
 import os
-import time
 import serial
 import numpy as np
 import matplotlib.pyplot as plt
@@ -15,6 +14,8 @@ from autocar_msgs.msg import State2D
 from ackermann_msgs.msg import AckermannDriveStamped
 from nav_msgs.msg import Odometry
 
+from autocar_nav.node_clock import NodeClock
+
 fast_flag =False
 S = 0x53
 T = 0x54
@@ -43,7 +44,8 @@ class erp42(Node):
     self.state_sub = self.create_subscription(State2D, '/autocar/state2D', self.vehicle_callback, 10)
     # self.state_sub = self.create_subscription(Odometry, '/data/encoder_vel_two', self.vehicle_callback, 10)
     self.ser = serial.serial_for_url("/dev/ttyERP", baudrate=115200, timeout=1)
-    self.departure = time.time()
+    self.clock = NodeClock(self) # use_sim_time 이면 /clock 기준
+    self.departure = self.clock.now()
     self.target_speed = 0.0
     self.velocity = 0.0
     self.speed = 0.0
@@ -58,7 +60,7 @@ class erp42(Node):
     self.prev_gear = 0
     self.gear_change = False
     self.slow_down = False
-    self.brake_time = time.time()
+    self.brake_time = self.clock.now()
     self.brake_force = 0
     self.t = 0
     self.dt = 0.3
@@ -71,7 +73,7 @@ class erp42(Node):
     self.integral = 0
 
     # plot variable
-    self.time = time.time()
+    self.time = self.clock.now()
     self.times = []
     self.target_value = []
     self.actual_value = []
@@ -229,7 +231,7 @@ class erp42(Node):
     self.Send_to_ERP42(self.gear, self.speed, -self.steer, self.brake)
 
   def plot_creator(self):
-    elapsed_time = time.time() - self.time
+    elapsed_time = self.clock.since(self.time)
     self.times.append(elapsed_time)
     self.target_value.append(self.target_speed * 3.6)
     self.input_value.append(self.speed * 3.6)
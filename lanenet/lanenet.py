@@ -11,7 +11,7 @@ from sensor_msgs.msg import Image
 from visualization_msgs.msg import Marker
 from ultrafastLaneDetector import UltrafastLaneDetector, ModelType
 from geometry_msgs.msg import Point
-from scipy.stats import iqr
+from autocar_nav.streaming_stats import RollingVariance, RollingQuantile
 
 class LaneNet(Node):
 
@@ -38,7 +38,9 @@ class LaneNet(Node):
         use_gpu = True
         self.reliability_var = 1000
 
-        self.lateral_error_array = []
+        # 최근 20 개 lateral error 의 분산 / 사분위, 한 frame 에 한 번씩 갱신
+        self.lateral_error_var = RollingVariance(20)
+        self.lateral_error_quantile = RollingQuantile(20)
 
         # Initialize lane detection model
         self.lane_detector = UltrafastLaneDetector(model_path, model_type, use_gpu)
@@ -125,19 +127,15 @@ class LaneNet(Node):
 
     def reliability_of_lateral_error(self, lateral_error):
 
-        self.lateral_error_array.append(lateral_error)
-        if len(self.lateral_error_array) > 20:
-            del self.lateral_error_array[0]
-        self.reliability_var = np.var(self.lateral_error_array)
-        reliability_IQR = iqr(self.lateral_error_array)
+        self.lateral_error_var.append(lateral_error)
+        self.lateral_error_quantile.append(lateral_error)
+        self.reliability_var = self.lateral_error_var.variance()
+        reliability_IQR = self.lateral_error_quantile.iqr()
         print(f'IQR: {reliability_IQR}')
         print(f'Variance: {self.reliability_var}')
 
-        #outlire 검출
-        outliers = []
-        for value in self.lateral_error_array:
-            if value < np.percentile(lateral_error, q=25) - (1.5 * reliability_IQR) or value > np.percentile(lateral_error, q=75) + (1.5 * reliability_IQR):
-                outliers.append(value)
+        #outlire 검출 (window 사분위 기준)
+        outliers = [value for value in self.lateral_error_quantile.window if self.lateral_error_quantile.is_outlier(value)]
         print(f'이상치: {outliers}')
 
     # def pub_lane_maker(self, list_for_rviz):
@@ -1,7 +1,6 @@
 import time
 import cv2
 import torch
-import statistics
 import numpy as np
 
 from numpy import random
@@ -17,6 +16,7 @@ import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Image
 from std_msgs.msg import Int32MultiArray, String
+from autocar_nav.streaming_stats import MajorityVote
 
 WEIGHTS = 'weights/delivery_t.pt'
 IMG_SIZE = 640
@@ -122,7 +122,7 @@ class YOLOv7(Node):
         self.text = []
 
         # [[A queue], [B1 queue], [B2 queue], ...]
-        self.queue_list = [[-1 for i in range(QUEUE_SIZE)] for j in range(len(CLASS_MAP))]
+        self.queue_list = [MajorityVote(QUEUE_SIZE, fill=-1) for j in range(len(CLASS_MAP))]
 
         # [[A1 to A queue], [A2 to A queue], [A3 to A queue], [B1 to B1 queue], [B2 to B2 queue], [B3 to B3 queue], ...]
         self.id_to_queue_list = [self.queue_list[i] for i in range(len(CLASS_MAP)) for _ in range(len(CLASS_MAP[i]))]
@@ -220,7 +220,7 @@ class YOLOv7(Node):
 
                 else:
                     for queue in self.queue_list:
-                        if len(queue) == QUEUE_SIZE: # append -1 to an undetected classes
+                        if not queue.updated: # append -1 to an undetected classes
                             queue.append(-1)
 
             if len(images) != 0:
@@ -235,7 +235,7 @@ class YOLOv7(Node):
 
         else:
             for queue in self.queue_list:
-                if len(queue) == QUEUE_SIZE: # append -1 to an undetected classes
+                if not queue.updated: # append -1 to an undetected classes
                     queue.append(-1)
 
         # return results
@@ -278,23 +278,16 @@ class YOLOv7(Node):
         if queue.count(-1) > int(QUEUE_SIZE / 2):
             return -1
         else:
-            for element in queue: # get latest x_min
-                if element != -1:
-                    val = element
-            return val
+            return queue.latest(skip=-1) # get latest x_min
 
 
     def hard_vote(self, queue):
-        return statistics.mode(queue)
+        return queue.mode()
 
 
     def yolo_pub(self):
         final_check = Int32MultiArray()
 
-        for queue in self.queue_list:
-            while len(queue) != QUEUE_SIZE: # delete first element
-                del queue[0]
-
         queue_list = self.queue_list
 
         # queue voting
@@ -304,6 +297,9 @@ class YOLOv7(Node):
             else:
                 final_check.data.append(self.delivery_vote(queue_list[idx]))
 
+        for queue in queue_list: # 다음 주기의 미검출 표시용
+            queue.updated = False
+
         self.delivery_pub.publish(final_check)
 
 
@@ -3,7 +3,6 @@
 import time
 import cv2
 import torch
-import statistics
 import numpy as np
 
 from numpy import random
@@ -18,6 +17,7 @@ import rclpy
 from rclpy.node import Node
 from sensor_msgs.msg import Image
 from std_msgs.msg import Int32MultiArray, String
+from autocar_nav.streaming_stats import MajorityVote
 
 WEIGHTS = 'weights/tf_best.pt'
 IMG_SIZE = 640
@@ -65,7 +65,7 @@ class YOLOv7(Node):
         self.img_height = IMG_SIZE
         self.mode = 'None'
 
-        self.queue_list = [[0 for i in range(QUEUE_SIZE)] for j in range(5)]
+        self.queue_list = [MajorityVote(QUEUE_SIZE, fill=0) for j in range(5)]
 
         self.timer = self.create_timer(0.1, self.yolo_pub)
 
@@ -164,7 +164,7 @@ class YOLOv7(Node):
     # 0 : Green  1 : Left  2 : Red  3 : Straightleft  4 : Yellow
     # ================================================================================
     def hard_vote(self, queue):
-        if sum(queue) > 0.7 * QUEUE_SIZE:
+        if queue.count(1) > 0.7 * QUEUE_SIZE:
             return True
 
         else:
@@ -176,9 +176,6 @@ class YOLOv7(Node):
         data = ""
 
         for n in range(5):
-            while len(self.queue_list[n]) != QUEUE_SIZE: # delete first element
-                del self.queue_list[n][0]
-
             queue_list = self.queue_list[n]
 
             # queue voting